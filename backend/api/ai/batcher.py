@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import orjson
+from typing import List, Optional, Set, Tuple
+from pydantic_ai.messages import ModelMessage
+from .agents import query_type_agent, query_type_batch_agent
+from ..config import QUERY_TYPE_BATCH_SIZE, QUERY_TYPE_BATCH_WINDOW
+
+logger = logging.getLogger(__name__)
+
+# A standalone query waiting to be classified: (query, future for its query type)
+_PendingQuery = Tuple[str, asyncio.Future]
+
+_QUERY_TYPES = {"simple", "sql"}
+
+# Pending classifications, collected into batches by the background batcher
+_classify_queue: Optional[asyncio.Queue] = None
+_batcher_task: Optional[asyncio.Task] = None
+# Batches being classified, referenced until done so they aren't garbage collected
+_pending_batches: Set[asyncio.Task] = set()
+
+async def _classify_one(query: str, message_history: List[ModelMessage]) -> str:
+    result = await query_type_agent.run(query, message_history=message_history)
+    return result.data.query_type
+
+async def _resolve(future: asyncio.Future, query: str):
+    """Classify one query into its future. A caller that timed out has already cancelled the future."""
+    try:
+        query_type = await _classify_one(query, [])
+    except Exception as e:
+        if not future.done():
+            future.set_exception(e)
+    else:
+        if not future.done():
+            future.set_result(query_type)
+
+async def _classify_batch(batch: List[_PendingQuery]):
+    """Classify a batch of standalone queries in one agent call, falling back to one call per query."""
+    if len(batch) > 1:
+        try:
+            # Each query is a separate JSON string, so one user's text can't pose as another's query
+            queries = [{"id": i, "query": query} for i, (query, _) in enumerate(batch)]
+            result = await query_type_batch_agent.run(orjson.dumps(queries).decode())
+            query_types = result.data.query_types
+            if len(query_types) != len(queries):
+                raise ValueError(f"expected {len(queries)} query types, got {len(query_types)}")
+            if not set(query_types) <= _QUERY_TYPES:
+                raise ValueError(f"unexpected query types: {query_types}")
+            for (_, future), query_type in zip(batch, query_types):
+                if not future.done():
+                    future.set_result(query_type)
+            return
+        except Exception as e:
+            logger.warning(f"Batched query classification failed, classifying individually: {e}")
+
+    await asyncio.gather(*(_resolve(future, query) for query, future in batch if not future.done()))
+
+def _dispatch(batch: List[_PendingQuery]):
+    # Classified in its own task so the next batch can be collected meanwhile
+    task = asyncio.create_task(_classify_batch(batch))
+    _pending_batches.add(task)
+    task.add_done_callback(_pending_batches.discard)
+
+async def _query_type_batcher():
+    """Collect queries for QUERY_TYPE_BATCH_WINDOW seconds or QUERY_TYPE_BATCH_SIZE queries, whichever comes first."""
+    loop = asyncio.get_running_loop()
+    batch: List[_PendingQuery] = []
+    try:
+        while True:
+            batch = [await _classify_queue.get()]
+            deadline = loop.time() + QUERY_TYPE_BATCH_WINDOW
+            while len(batch) < QUERY_TYPE_BATCH_SIZE:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(_classify_queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            collected, batch = batch, []
+            _dispatch(collected)
+    except asyncio.CancelledError:
+        # Don't strand queries collected before shutdown
+        if batch:
+            _dispatch(batch)
+        raise
+
+async def classify_query_type(query: str, message_history: List[ModelMessage]) -> str:
+    """Classify a query as "simple" or "sql", batched with concurrent queries if the batcher is running.
+
+    A query with history is classified in the context of its own conversation,
+    so only standalone queries can share a call."""
+    if _classify_queue is None or message_history:
+        return await _classify_one(query, message_history)
+
+    future = asyncio.get_running_loop().create_future()
+    _classify_queue.put_nowait((query, future))
+    return await future
+
+def start_query_type_batcher():
+    """Start the background task that batches query classification."""
+    global _classify_queue, _batcher_task
+    if _batcher_task is None:
+        _classify_queue = asyncio.Queue()
+        _batcher_task = asyncio.create_task(_query_type_batcher())
+
+async def stop_query_type_batcher():
+    """Stop the background batcher and classify any queries still queued."""
+    global _classify_queue, _batcher_task
+    if _batcher_task is None:
+        return
+
+    _batcher_task.cancel()
+    try:
+        await _batcher_task
+    except asyncio.CancelledError:
+        pass
+
+    pending = []
+    while not _classify_queue.empty():
+        pending.append(_classify_queue.get_nowait())
+    if pending:
+        _dispatch(pending)
+    if _pending_batches:
+        await asyncio.gather(*_pending_batches, return_exceptions=True)
+
+    _classify_queue = None
+    _batcher_task = None
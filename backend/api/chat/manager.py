@@ -1,12 +1,32 @@
 import uuid
 import json
-from typing import Dict, List, Any
+import asyncio
+import asyncpg
+import logging
+import orjson
+from typing import Dict, List, Any, Optional, Set, Tuple
+from cachetools import LRUCache, TTLCache
+from pydantic import BaseModel
 from pydantic_ai.messages import ModelMessage
-from ..database.connection import get_chats_db_connection
-from ..config import CHAT_TABLE_NAME
+from ..database.connection import chats_connection
+from ..database.queries import invalidate_query_cache
+from ..http_cache import bump_resource_version
+from ..config import (
+    CHAT_TABLE_NAME, ALERT_BATCH_SIZE, ALERT_FLUSH_INTERVAL, CHAT_MESSAGE_CACHE_SIZE,
+    TRANSACTION_DETAILS_CACHE_TTL, TRANSACTION_DETAILS_CACHE_MAX_ENTRIES
+)
 
-# Keep minimal in-memory cache for PydanticAI message objects (not persistent)
-chat_message_cache: Dict[str, List[ModelMessage]] = {}
+logger = logging.getLogger(__name__)
+
+# Keep minimal in-memory cache for PydanticAI message objects (not persistent).
+# Follow-up turns reuse it instead of rebuilding context from the database.
+chat_message_cache: LRUCache = LRUCache(maxsize=CHAT_MESSAGE_CACHE_SIZE)
+
+# Event logs of recently alerted transactions; alert storms repeat the same ids
+_transaction_details_cache: TTLCache = TTLCache(maxsize=TRANSACTION_DETAILS_CACHE_MAX_ENTRIES, ttl=TRANSACTION_DETAILS_CACHE_TTL)
+
+# Chat turns being written in the background, referenced until done so they aren't garbage collected
+_pending_chat_writes: Set[asyncio.Task] = set()
 
 def create_new_chat() -> str:
     """Create a new chat and return its ID."""
@@ -15,13 +35,21 @@ def create_new_chat() -> str:
     return chat_id
 
 async def update_chat_history(chat_id: str, messages: List[ModelMessage], query: str = None, response_data: Any = None, response_summary: str = None):
-    """Update chat history in memory cache and save query and response to database."""
+    """Update chat history in memory cache and save query and response to database.
+    The database write runs in the background so the caller doesn't wait on it."""
     # Update in-memory cache for PydanticAI messages
     chat_message_cache[chat_id] = messages
     
     # Save query and response to database if provided
     if query:
-        await save_chat_query(chat_id, query, response_data, response_summary)
+        task = asyncio.create_task(save_chat_query(chat_id, query, response_data, response_summary))
+        _pending_chat_writes.add(task)
+        task.add_done_callback(_pending_chat_writes.discard)
+
+async def flush_chat_writes():
+    """Wait for chat turns still being written in the background."""
+    if _pending_chat_writes:
+        await asyncio.gather(*_pending_chat_writes, return_exceptions=True)
 
 def get_chat_history(chat_id: str) -> List[ModelMessage]:
     """Get chat history for a specific chat ID from memory cache."""
@@ -31,18 +59,15 @@ async def load_chat_messages_from_db(chat_id: str) -> List[ModelMessage]:
     """Load and reconstruct PydanticAI messages from database for conversation context.
     This is a simplified reconstruction - in practice you might want to store 
     the full message objects as JSON."""
-    db_history = await load_chat_history_from_db(chat_id)
-    
     # Get last 5 summaries for context
-    conn = await get_chats_db_connection()
-    summaries = await conn.fetch(f"""
-        SELECT summary 
-        FROM {CHAT_TABLE_NAME}
-        WHERE chat_id = $1 AND summary IS NOT NULL
-        ORDER BY timestamp DESC
-        LIMIT 5
-    """, chat_id)
-    await conn.close()
+    async with chats_connection() as conn:
+        summaries = await conn.fetch(f"""
+            SELECT summary 
+            FROM {CHAT_TABLE_NAME}
+            WHERE chat_id = $1 AND summary IS NOT NULL
+            ORDER BY timestamp DESC
+            LIMIT 5
+        """, chat_id)
     
     # Add summaries to message cache
     if chat_id not in chat_message_cache:
@@ -60,33 +85,36 @@ async def load_chat_messages_from_db(chat_id: str) -> List[ModelMessage]:
 
 # --- Chat Database Persistence Functions ---
 
-async def save_chat_query(chat_id: str, query: str, response_data: str = None, response_summary: str = None):
+async def save_chat_query(chat_id: str, query: str, response_data: Any = None, response_summary: str = None):
     """Save a chat query to the database."""
     try:
-        conn = await get_chats_db_connection()
-        
-        # Convert response data to string if needed
-        response_str = json.dumps(response_data, default=str) if response_data else None
+        # Convert response data to string if needed; models are encoded field by
+        # field with orjson so their data rows aren't copied into a new dict first
+        if isinstance(response_data, BaseModel):
+            response_str = orjson.dumps(dict(response_data), default=str).decode()
+        else:
+            response_str = json.dumps(response_data, default=str) if response_data else None
         
-        # Create table if it doesn't exist
-        await conn.execute(f"""
-        CREATE TABLE IF NOT EXISTS {CHAT_TABLE_NAME} (
-            id SERIAL PRIMARY KEY,
-            chat_id VARCHAR(255) NOT NULL,
-            timestamp TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-            query TEXT,
-            response TEXT,
-            summary TEXT
-        )
-        """)
-        
-        # Insert the record
-        await conn.execute(f"""
-        INSERT INTO {CHAT_TABLE_NAME} (chat_id, query, response, summary)
-        VALUES ($1, $2, $3, $4)
-        """, chat_id, query, response_str, response_summary)
+        async with chats_connection() as conn:
+            # Create table if it doesn't exist
+            await conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {CHAT_TABLE_NAME} (
+                id SERIAL PRIMARY KEY,
+                chat_id VARCHAR(255) NOT NULL,
+                timestamp TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+                query TEXT,
+                response TEXT,
+                summary TEXT
+            )
+            """)
+            
+            # Insert the record
+            await conn.execute(f"""
+            INSERT INTO {CHAT_TABLE_NAME} (chat_id, query, response, summary)
+            VALUES ($1, $2, $3, $4)
+            """, chat_id, query, response_str, response_summary)
         
-        await conn.close()
+        bump_resource_version("chats")
             
     except Exception:
         pass  # Fail silently for POC
@@ -94,49 +122,63 @@ async def save_chat_query(chat_id: str, query: str, response_data: str = None, r
 async def load_chat_history_from_db(chat_id: str) -> List[Dict[str, Any]]:
     """Load chat history from the database."""
     try:
-        conn = await get_chats_db_connection()
-        rows = await conn.fetch(f"""
-        SELECT id, chat_id, timestamp, query, response, summary
-        FROM {CHAT_TABLE_NAME}
-        WHERE chat_id = $1
-        ORDER BY timestamp ASC
-        """, chat_id)
-        await conn.close()
+        async with chats_connection() as conn:
+            rows = await conn.fetch(f"""
+            SELECT id, chat_id, timestamp, query, response, summary
+            FROM {CHAT_TABLE_NAME}
+            WHERE chat_id = $1
+            ORDER BY timestamp ASC
+            """, chat_id)
         return [dict(row) for row in rows]
     except Exception:
         return []
 
-async def get_all_chats_from_db() -> List[Dict[str, Any]]:
-    """Get all chat records from the database as they are stored."""
-    try:
-        conn = await get_chats_db_connection()
-        rows = await conn.fetch(f"""
+async def get_all_chats_from_db() -> List[asyncpg.Record]:
+    """Get all chat records from the database as they are stored.
+    Rows are returned as asyncpg Records, which support key access like dicts.
+    Errors are raised rather than returned as an empty list, so a failed read
+    is never served and tagged as the current list of chats."""
+    async with chats_connection() as conn:
+        return await conn.fetch(f"""
         SELECT DISTINCT ON (chat_id) id, chat_id, query, timestamp  
         FROM {CHAT_TABLE_NAME}
         ORDER BY chat_id, timestamp ASC
         """)
-        await conn.close()
-        return [dict(row) for row in rows]
-    except Exception:
-        return []
+
+async def save_chat_query_if_exists(chat_id: str, query: str, response_data: str = None) -> bool:
+    """Save a chat query only if the chat already exists. Returns whether the query was saved."""
+    response_str = json.dumps(response_data, default=str) if response_data else None
+    
+    async with chats_connection() as conn:
+        # Existence check and insert in a single round-trip
+        saved_id = await conn.fetchval(f"""
+        INSERT INTO {CHAT_TABLE_NAME} (chat_id, query, response)
+        SELECT $1, $2, $3
+        WHERE EXISTS (SELECT 1 FROM {CHAT_TABLE_NAME} WHERE chat_id = $1)
+        RETURNING id
+        """, chat_id, query, response_str)
+    
+    if saved_id is None:
+        return False
+    bump_resource_version("chats")
+    return True
 
 async def delete_chat_from_db(chat_id: str) -> bool:
-    """Delete a chat from the database."""
-    try:
-        conn = await get_chats_db_connection()
-        await conn.execute(f"DELETE FROM {CHAT_TABLE_NAME} WHERE chat_id = $1", chat_id)
-        await conn.close()
-        return True
-    except Exception:
+    """Delete a chat from the database. Returns whether the chat existed."""
+    async with chats_connection() as conn:
+        deleted_id = await conn.fetchval(f"DELETE FROM {CHAT_TABLE_NAME} WHERE chat_id = $1 RETURNING id", chat_id)
+    
+    if deleted_id is None:
         return False
+    bump_resource_version("chats")
+    return True
 
 async def chat_exists_in_db(chat_id: str) -> bool:
     """Check if a chat exists in the database."""
     try:
-        conn = await get_chats_db_connection()
-        count = await conn.fetchval(f"SELECT COUNT(*) FROM {CHAT_TABLE_NAME} WHERE chat_id = $1", chat_id)
-        await conn.close()
-        return count > 0
+        async with chats_connection() as conn:
+            found = await conn.fetchval(f"SELECT 1 FROM {CHAT_TABLE_NAME} WHERE chat_id = $1 LIMIT 1", chat_id)
+        return found is not None
     except Exception:
         return False
 
@@ -147,10 +189,14 @@ def delete_chat_from_memory(chat_id: str):
 
 
 async def transaction_details_from_db(transaction_id: str) -> Dict[str, Any]:
-    """Get transaction details from the database."""
+    """Get transaction details from the database.
+    Non-empty results are cached for TRANSACTION_DETAILS_CACHE_TTL seconds."""
+    cached = _transaction_details_cache.get(transaction_id)
+    if cached is not None:
+        return cached
+    
     try:
-        conn = await get_chats_db_connection()
-        event_types_query = f"""    
+        event_types_query = """    
             select
                 affected_service,
                 alert_description,
@@ -164,23 +210,114 @@ async def transaction_details_from_db(transaction_id: str) -> Dict[str, Any]:
             from
                 transactions oftd
             where
-                transaction_id = '{transaction_id}'
+                transaction_id = $1
         """
-        rows = await conn.fetch(event_types_query)
-        await conn.close()
-        return [dict(row) for row in rows]
+        async with chats_connection() as conn:
+            rows = await conn.fetch(event_types_query, transaction_id)
+        details = [dict(row) for row in rows]
+        if details:
+            _transaction_details_cache[transaction_id] = details
+        return details
     except Exception:
         return {}
     
 async def insert_transaction_details_to_db(transaction_id: str, details: Dict[str, Any]):
     """Insert transaction details into the database."""
     try:
-        conn = await get_chats_db_connection()
         query = f"""    
         INSERT INTO alerts (transaction_id, summary) VALUES ($1, $2)
         """
-        await conn.execute(query, transaction_id, details)
-        await conn.close()
+        async with chats_connection() as conn:
+            await conn.execute(query, transaction_id, details)
+        invalidate_query_cache()
+        bump_resource_version("alerts")
     except Exception as e:
-        print(f"Error inserting transaction details into the database: {e}")
+        logger.error(f"Error inserting transaction details into the database: {e}")
+
+# --- Batched Alert Persistence ---
+
+# Pending (transaction_id, summary) rows, flushed by the background alert writer
+_alert_queue: Optional[asyncio.Queue] = None
+_alert_writer_task: Optional[asyncio.Task] = None
+
+async def bulk_insert_alerts(rows: List[Tuple[str, str]]):
+    """Insert multiple alert rows into the database in a single round-trip.
+
+    executemany is atomic, so if the batch fails the rows are retried one at a
+    time and only the bad ones are lost."""
+    try:
+        query = """
+        INSERT INTO alerts (transaction_id, summary) VALUES ($1, $2)
+        """
+        async with chats_connection() as conn:
+            await conn.executemany(query, rows)
+        invalidate_query_cache()
+        bump_resource_version("alerts")
+    except Exception as e:
+        logger.error(f"Error inserting {len(rows)} alerts into the database, inserting individually: {e}")
+        for transaction_id, summary in rows:
+            await insert_transaction_details_to_db(transaction_id, summary)
+
+async def queue_alert_insert(transaction_id: str, summary: str):
+    """Queue an alert row for batched insertion, writing it directly if the writer is not running."""
+    if _alert_queue is None:
+        await insert_transaction_details_to_db(transaction_id, summary)
+        return
+    _alert_queue.put_nowait((transaction_id, summary))
+
+async def _alert_writer():
+    """Drain queued alerts every ALERT_FLUSH_INTERVAL seconds or ALERT_BATCH_SIZE rows, whichever comes first."""
+    loop = asyncio.get_running_loop()
+    rows: List[Tuple[str, str]] = []
+    flush: Optional[asyncio.Task] = None
+    try:
+        while True:
+            rows = [await _alert_queue.get()]
+            deadline = loop.time() + ALERT_FLUSH_INTERVAL
+            while len(rows) < ALERT_BATCH_SIZE:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    rows.append(await asyncio.wait_for(_alert_queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            batch, rows = rows, []
+            # Shielded so shutdown waits for an in-flight insert instead of aborting it
+            flush = asyncio.create_task(bulk_insert_alerts(batch))
+            await asyncio.shield(flush)
+    except asyncio.CancelledError:
+        # Don't drop rows being inserted or collected before shutdown
+        if flush is not None and not flush.done():
+            await flush
+        if rows:
+            await bulk_insert_alerts(rows)
+        raise
+
+def start_alert_writer():
+    """Start the background task that batches alert inserts."""
+    global _alert_queue, _alert_writer_task
+    if _alert_writer_task is None:
+        _alert_queue = asyncio.Queue()
+        _alert_writer_task = asyncio.create_task(_alert_writer())
+
+async def stop_alert_writer():
+    """Stop the background alert writer and flush any rows still queued."""
+    global _alert_queue, _alert_writer_task
+    if _alert_writer_task is None:
+        return
+    
+    _alert_writer_task.cancel()
+    try:
+        await _alert_writer_task
+    except asyncio.CancelledError:
         pass
+    
+    pending = []
+    while not _alert_queue.empty():
+        pending.append(_alert_queue.get_nowait())
+    if pending:
+        await bulk_insert_alerts(pending)
+    
+    _alert_queue = None
+    _alert_writer_task = None
@@ -1,5 +1,5 @@
 import os
-import json
+import orjson
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,6 +9,26 @@ REQUEST_TIMEOUT = 120  # 2 minutes timeout for requests
 AI_AGENT_TIMEOUT = 60  # 1 minute timeout for AI agent calls
 DATABASE_TIMEOUT = 30  # 30 seconds timeout for database queries
 MAX_QUERY_RESULTS = 1000  # Limit results to prevent memory issues
+QUERY_STREAM_PREFETCH = 500  # Rows fetched per round-trip when streaming results
+QUERY_CACHE_TTL = 30  # Cache read-only query results for 30 seconds
+QUERY_CACHE_MAX_ENTRIES = 512  # Maximum number of cached query results
+SUMMARY_CACHE_TTL = 10  # Share the transaction summary across dashboard loads for 10 seconds
+QUERY_FIX_OFFLOAD_LENGTH = 4096  # Fix queries longer than this in a worker thread
+CHART_SQL_CACHE_SIZE = 256  # Chart SQL derivations remembered per query text
+CHART_MAX_BARS = 20  # Bars shown in a chart derived from a grouped query
+RESPONSE_CACHE_TTL = 300  # Reuse chat responses for repeated questions for 5 minutes
+RESPONSE_CACHE_MAX_ENTRIES = 2048  # Maximum number of cached chat responses
+RESPONSE_CACHE_MAX_PER_CHAT = 64  # Maximum embedded queries compared per chat
+RESPONSE_CACHE_SIMILARITY = 0.93  # Cosine similarity at which two queries count as the same
+EMBEDDING_MODEL = "text-embedding-3-small"  # OpenAI model used to embed queries
+ALERT_BATCH_SIZE = 100  # Maximum alert rows written per batch insert
+ALERT_FLUSH_INTERVAL = 0.05  # 50ms window to collect alert rows before flushing
+QUERY_TYPE_BATCH_SIZE = 16  # Maximum queries classified in one batched agent call
+QUERY_TYPE_BATCH_WINDOW = 0.02  # 20ms window to collect concurrent queries before classifying
+
+CHAT_MESSAGE_CACHE_SIZE = 1024  # Chats whose agent message history is kept in memory
+TRANSACTION_DETAILS_CACHE_TTL = 60  # Reuse a transaction's event log across repeated alerts for 60 seconds
+TRANSACTION_DETAILS_CACHE_MAX_ENTRIES = 1024  # Maximum number of cached transaction event logs
 
 # Chat persistence configuration
 CHAT_DB_NAME = "ivy"  # Database name for chat persistence
@@ -94,6 +114,9 @@ TRANSACTION_COLUMNS = {
     "verification_level": "string - Verification level"
 }
 
+# Serialized once so every prompt embeds a byte-identical schema block
+TRANSACTION_COLUMNS_JSON = orjson.dumps(TRANSACTION_COLUMNS, option=orjson.OPT_SORT_KEYS).decode()
+
 # CORS configuration
 CORS_ORIGINS = [
     "http://localhost:3000",        # React dev server default
@@ -126,6 +149,7 @@ CORS_EXPOSE_HEADERS = [
     "Content-Type",
     "X-Total-Count",
     "X-Page-Count",
+    "ETag",
 ]
 
 def validate_environment():
@@ -1,15 +1,17 @@
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Request
 from ..models.schemas import QueryRequest, ChatQueryRequest, ChatResponse, ApiResponse
 from ..services.chat_service import handle_chat_query_service
-from ..chat.manager import get_all_chats_from_db, load_chat_history_from_db, delete_chat_from_db, chat_exists_in_db, save_chat_query, delete_chat_from_memory
+from ..chat.manager import get_all_chats_from_db, load_chat_history_from_db, delete_chat_from_db, save_chat_query_if_exists, delete_chat_from_memory
+from ..responses import api_response, model_response
+from ..http_cache import resource_etag, not_modified, with_etag
 from datetime import datetime
 
 router = APIRouter()
 
 @router.post("/query", response_model=ChatResponse)
 async def handle_chat_query(request: ChatQueryRequest):
-    return await handle_chat_query_service(request)
+    return model_response(await handle_chat_query_service(request))
 
 @router.post("/query-simple", response_model=ChatResponse)
 async def handle_simple_query(request: QueryRequest):
@@ -18,31 +20,38 @@ async def handle_simple_query(request: QueryRequest):
         chat_type="new",
         chat_id=None
     )
-    return await handle_chat_query_service(chat_request)
+    return model_response(await handle_chat_query_service(chat_request))
 
 @router.get("/chats", response_model=ApiResponse)
-async def get_all_chats():
+async def get_all_chats(request: Request):
     """Get all chat records from database as raw JSON objects."""
+    # Taken before reading so a write during the read changes the next ETag
+    etag = resource_etag("chats")
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    
     try:
         raw_chats_data = await get_all_chats_from_db()
         
-        chat_records = []
-        for record in raw_chats_data:
-            chat_records.append({
-                "id": record['id'],
-                "chat_id": record['chat_id'],
-                "query": record['query'],
-                "timestamp": record['timestamp'].isoformat() if record['timestamp'] else None,
-            })
+        chat_records = [
+            {
+                "id": record_id,
+                "chat_id": chat_id,
+                "query": query,
+                "timestamp": timestamp,
+            }
+            for record_id, chat_id, query, timestamp in raw_chats_data
+        ]
         
-        return ApiResponse(
+        return with_etag(request, api_response(
             success=True,
             message=f"Retrieved {len(chat_records)} chat records",
             data={"chats": chat_records, "count": len(chat_records)}
-        )
+        ), etag)
         
     except Exception as e:
-        return ApiResponse(
+        return api_response(
             success=False,
             message="Failed to get chat records",
             error=str(e)
@@ -55,30 +64,28 @@ async def get_chat_history_endpoint(chat_id: str):
         db_history = await load_chat_history_from_db(chat_id)
         
         if not db_history:
-            return ApiResponse(
+            return api_response(
                 success=False,
                 message=f"Chat {chat_id} not found",
                 error="Chat not found"
             )
         
-        first_msg = db_history[0] if db_history else None
-        last_msg = db_history[-1] if db_history else None
-        
+        # Timestamps are datetimes; orjson encodes them as ISO 8601
         history = {
             "chat_id": chat_id,
             "messages": db_history,
-            "created_at": first_msg['timestamp'].isoformat() if first_msg else datetime.now().isoformat(),
-            "updated_at": last_msg['timestamp'].isoformat() if last_msg else datetime.now().isoformat()
+            "created_at": db_history[0]['timestamp'],
+            "updated_at": db_history[-1]['timestamp']
         }
         
-        return ApiResponse(
+        return api_response(
             success=True,
             message=f"Retrieved history for chat {chat_id}",
             data=history
         )
         
     except Exception as e:
-        return ApiResponse(
+        return api_response(
             success=False,
             message=f"Failed to get chat history for {chat_id}",
             error=str(e)
@@ -88,32 +95,25 @@ async def get_chat_history_endpoint(chat_id: str):
 async def delete_chat(chat_id: str):
     """Delete a specific chat conversation from database."""
     try:
-        if not await chat_exists_in_db(chat_id):
-            return ApiResponse(
+        deleted = await delete_chat_from_db(chat_id)
+        
+        if not deleted:
+            return ApiResponse.model_construct(
                 success=False,
                 message=f"Chat {chat_id} not found",
                 error="Chat not found"
             )
         
-        success = await delete_chat_from_db(chat_id)
+        delete_chat_from_memory(chat_id)
         
-        if success:
-            delete_chat_from_memory(chat_id)
-            
-            return ApiResponse(
-                success=True,
-                message=f"Chat {chat_id} deleted successfully",
-                data={"deleted_chat_id": chat_id}
-            )
-        else:
-            return ApiResponse(
-                success=False,
-                message=f"Failed to delete chat {chat_id}",
-                error="Database deletion failed"
-            )
+        return ApiResponse.model_construct(
+            success=True,
+            message=f"Chat {chat_id} deleted successfully",
+            data={"deleted_chat_id": chat_id}
+        )
         
     except Exception as e:
-        return ApiResponse(
+        return ApiResponse.model_construct(
             success=False,
             message=f"Failed to delete chat {chat_id}",
             error=str(e)
@@ -123,16 +123,16 @@ async def delete_chat(chat_id: str):
 async def update_chat_title(chat_id: str, title: str = Query(..., description="New title for the chat")):
     """Update the title of a chat conversation."""
     try:
-        if not await chat_exists_in_db(chat_id):
-            return ApiResponse(
+        saved = await save_chat_query_if_exists(chat_id, f"[TITLE_UPDATE]: {title}", "title_update")
+        
+        if not saved:
+            return ApiResponse.model_construct(
                 success=False,
                 message=f"Chat {chat_id} not found",
                 error="Chat not found"
             )
         
-        await save_chat_query(chat_id, f"[TITLE_UPDATE]: {title}", "title_update")
-        
-        return ApiResponse(
+        return ApiResponse.model_construct(
             success=True,
             message=f"Chat title updated successfully",
             data={
@@ -143,7 +143,7 @@ async def update_chat_title(chat_id: str, title: str = Query(..., description="N
         )
         
     except Exception as e:
-        return ApiResponse(
+        return ApiResponse.model_construct(
             success=False,
             message=f"Failed to update chat title for {chat_id}",
             error=str(e)
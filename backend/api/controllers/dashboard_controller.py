@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from ..models.schemas import (
     CreateDashboardRequest, AddChartToDashboardRequest,
     DashboardResponse, DashboardChartsResponse, ApiResponse
@@ -7,6 +7,8 @@ from ..services.dashboard_service import (
     create_dashboard_service, add_chart_to_dashboard_service,
     get_all_dashboards_service, get_dashboard_charts_service
 )
+from ..http_cache import resource_etag, not_modified, with_etag
+from ..responses import model_response
 
 router = APIRouter()
 
@@ -21,11 +23,15 @@ async def add_chart_to_dashboard(request: AddChartToDashboardRequest):
     return await add_chart_to_dashboard_service(request)
 
 @router.get("/", response_model=ApiResponse)
-async def get_all_dashboards():
+async def get_all_dashboards(request: Request):
     """Get all dashboards."""
-    return await get_all_dashboards_service()
+    etag = resource_etag("dashboards")
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    return with_etag(request, await get_all_dashboards_service(), etag)
 
 @router.get("/{dashboard_id}/charts", response_model=DashboardChartsResponse)
 async def get_dashboard_charts(dashboard_id: str):
     """Get all charts for a specific dashboard."""
-    return await get_dashboard_charts_service(dashboard_id) 
\ No newline at end of file
+    return model_response(await get_dashboard_charts_service(dashboard_id)) 
\ No newline at end of file
@@ -1,6 +1,8 @@
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Request
 from ..models.schemas import ApiResponse, GrafanaWebhookRequest
+from ..responses import api_response, stream_api_response
+from ..http_cache import resource_etag, not_modified, with_etag
 from ..services.transaction_service import (
     get_transaction_summary_service,
     get_user_transactions_service,
@@ -13,23 +15,24 @@ from ..services.transaction_service import (
 router = APIRouter()
 
 @router.get("/summary", response_model=ApiResponse)
-async def get_transaction_summary():
+async def get_transaction_summary(request: Request):
     try:
         summary = await get_transaction_summary_service()
         if summary:
-            return ApiResponse(
+            # The transactions table is written outside this API, so the ETag comes from the body
+            return with_etag(request, api_response(
                 success=True,
                 message="Transaction summary retrieved",
-                data=summary.dict()
-            )
+                data=summary.model_dump(mode="json", exclude_none=True)
+            ))
         else:
-            return ApiResponse(
+            return api_response(
                 success=False,
                 message="No transaction data found",
                 data=None
             )
     except Exception as e:
-        return ApiResponse(
+        return api_response(
             success=False,
             message="Failed to get transaction summary",
             error=str(e)
@@ -39,7 +42,7 @@ async def get_transaction_summary():
 async def get_user_transactions(user_id: str, limit: int = Query(10, ge=1, le=100)):
     try:
         data = await get_user_transactions_service(user_id, limit)
-        return ApiResponse(
+        return api_response(
             success=True,
             message=f"Retrieved {len(data)} transactions for user {user_id}",
             data={
@@ -49,59 +52,59 @@ async def get_user_transactions(user_id: str, limit: int = Query(10, ge=1, le=10
             }
         )
     except Exception as e:
-        return ApiResponse(
+        return api_response(
             success=False,
             message=f"Failed to get transactions for user {user_id}",
             error=str(e)
         )
 
 @router.get("/alerts", response_model=ApiResponse)
-async def get_transaction_events():
+async def get_transaction_events(request: Request):
+    etag = resource_etag("alerts")
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    
     try:
-        data = await get_transaction_alerts_service()
-        return ApiResponse(
-            success=True,
-            message="Alerts retrieved", 
-            data=data
-        )
+        return with_etag(request, await stream_api_response("Alerts retrieved", get_transaction_alerts_service()), etag)
     except Exception as e:
-        return ApiResponse(
+        return api_response(
             success=False,
             message="Failed to get alerts",
             error=str(e)
         ) 
 
 @router.post("/alerts/{alert_id}", response_model=ApiResponse)
-async def update_alert(alert_id: str):
+async def update_alert(alert_id: int):
     try:
         await update_alert_service(alert_id)
-        return ApiResponse(success=True, message="Alert updated")
+        return ApiResponse.model_construct(success=True, message="Alert updated")
     except Exception as e:
-        return ApiResponse(success=False, message="Failed to update alert", error=str(e))
+        return ApiResponse.model_construct(success=False, message="Failed to update alert", error=str(e))
 
 @router.post('/webhook', response_model=ApiResponse)
 async def grafana_webhook(request: GrafanaWebhookRequest):
     try:
         result = await handle_grafana_webhook_service(request)
-        return ApiResponse(
+        return ApiResponse.model_construct(
             success=True,
             message="Alert processed and analyzed.",
             data=result.model_dump()
         )
     except Exception as e:
-        return ApiResponse(success=False, message="Internal server error", error=str(e))
+        return ApiResponse.model_construct(success=False, message="Internal server error", error=str(e))
 
 @router.get("/failed-transactions/{transaction_id}", response_model=ApiResponse)
 async def get_failed_transaction_details(transaction_id: str):
     try:
         data = await get_failed_transaction_details_service(transaction_id)
-        return ApiResponse(
+        return api_response(
             success=True,
             message=f"Retrieved details for failed transaction {transaction_id}",
             data=data
         )
     except Exception as e:
-        return ApiResponse(
+        return api_response(
             success=False,
             message=f"Failed to get details for failed transaction {transaction_id}",
             error=str(e)
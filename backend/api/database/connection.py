@@ -1,5 +1,8 @@
+import asyncio
 import asyncpg
 import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
 from fastapi import HTTPException
 from ..config import DATABASE_URL, CHAT_DATABASE_URL, CHAT_DB_NAME
 
@@ -9,6 +12,21 @@ logger = logging.getLogger(__name__)
 # Constants
 DATABASE_TIMEOUT = 60
 CHAT_TABLE_NAME = "chats"
+TRANSACTIONS_POOL_MIN_SIZE = 5
+TRANSACTIONS_POOL_MAX_SIZE = 20
+CHATS_POOL_MIN_SIZE = 4
+CHATS_POOL_MAX_SIZE = 32
+# Prepared statements cached per pooled connection, keyed by SQL text. Cached
+# plans never expire so the fixed dashboard and alert queries are parsed and
+# planned once per connection, however long it lives.
+STATEMENT_CACHE_SIZE = 256
+STATEMENT_CACHE_LIFETIME = 0
+
+# Process-wide connection pools, created on FastAPI startup
+_transactions_pool: Optional[asyncpg.Pool] = None
+_transactions_pool_lock = asyncio.Lock()
+_chats_pool: Optional[asyncpg.Pool] = None
+_chats_pool_lock = asyncio.Lock()
 
 async def init_chats_table():
     """Initialize the chats table in the ivy database."""
@@ -134,8 +152,8 @@ async def get_transactions_db_connection():
         logger.error(f"Failed to connect to transactions database: {e}")
         raise HTTPException(status_code=500, detail=f"Transactions database connection failed: {str(e)}")
 
-async def get_chats_db_connection():
-    """Get a simple database connection for chats."""
+def _chats_db_url() -> str:
+    """Get the chats database URL, derived from the transactions URL if not set."""
     chat_db_url = CHAT_DATABASE_URL
     if not chat_db_url:
         # If CHAT_DATABASE_URL not set, derive from transactions DB URL
@@ -146,6 +164,11 @@ async def get_chats_db_connection():
             chat_db_url = f"{base_url}/{CHAT_DB_NAME}"
         else:
             raise RuntimeError("Cannot derive chat database URL")
+    return chat_db_url
+
+async def get_chats_db_connection():
+    """Get a simple database connection for chats."""
+    chat_db_url = _chats_db_url()
     
     try:
         return await asyncpg.connect(
@@ -159,6 +182,102 @@ async def get_chats_db_connection():
         logger.error(f"Failed to connect to chats database: {e}")
         raise HTTPException(status_code=500, detail=f"Chats database connection failed: {str(e)}")
 
+async def init_db_pools():
+    """Create the shared database connection pools."""
+    try:
+        await get_transactions_pool()
+    except Exception as e:
+        # The pool is created lazily on first use if startup fails
+        logger.warning(f"Transactions database pool not initialized at startup: {e}")
+    try:
+        await get_chats_pool()
+    except Exception as e:
+        logger.warning(f"Chats database pool not initialized at startup: {e}")
+
+async def close_db_pools():
+    """Close the shared database connection pools."""
+    global _transactions_pool, _chats_pool
+    if _transactions_pool is not None:
+        await _transactions_pool.close()
+        _transactions_pool = None
+        logger.info("Closed transactions database pool")
+    if _chats_pool is not None:
+        await _chats_pool.close()
+        _chats_pool = None
+        logger.info("Closed chats database pool")
+
+async def get_transactions_pool() -> asyncpg.Pool:
+    """Get the transactions connection pool, creating it on first use."""
+    global _transactions_pool
+    if _transactions_pool is not None:
+        return _transactions_pool
+    
+    async with _transactions_pool_lock:
+        if _transactions_pool is None:
+            transactions_db_url = DATABASE_URL
+            if not transactions_db_url:
+                raise RuntimeError("DATABASE_URL environment variable not set")
+            
+            try:
+                _transactions_pool = await asyncpg.create_pool(
+                    transactions_db_url,
+                    min_size=TRANSACTIONS_POOL_MIN_SIZE,
+                    max_size=TRANSACTIONS_POOL_MAX_SIZE,
+                    command_timeout=DATABASE_TIMEOUT,
+                    statement_cache_size=STATEMENT_CACHE_SIZE,
+                    max_cached_statement_lifetime=STATEMENT_CACHE_LIFETIME,
+                    server_settings={
+                        'application_name': 'payment_ops_copilot_transactions',
+                    }
+                )
+                logger.info("Created transactions database pool")
+            except Exception as e:
+                logger.error(f"Failed to create transactions database pool: {e}")
+                raise HTTPException(status_code=500, detail=f"Transactions database connection failed: {str(e)}")
+    
+    return _transactions_pool
+
+async def get_chats_pool() -> asyncpg.Pool:
+    """Get the chats connection pool, creating it on first use."""
+    global _chats_pool
+    if _chats_pool is not None:
+        return _chats_pool
+    
+    async with _chats_pool_lock:
+        if _chats_pool is None:
+            try:
+                _chats_pool = await asyncpg.create_pool(
+                    _chats_db_url(),
+                    min_size=CHATS_POOL_MIN_SIZE,
+                    max_size=CHATS_POOL_MAX_SIZE,
+                    command_timeout=DATABASE_TIMEOUT,
+                    statement_cache_size=STATEMENT_CACHE_SIZE,
+                    max_cached_statement_lifetime=STATEMENT_CACHE_LIFETIME,
+                    server_settings={
+                        'application_name': 'payment_ops_copilot_chats',
+                    }
+                )
+                logger.info("Created chats database pool")
+            except Exception as e:
+                logger.error(f"Failed to create chats database pool: {e}")
+                raise HTTPException(status_code=500, detail=f"Chats database connection failed: {str(e)}")
+    
+    return _chats_pool
+
+@asynccontextmanager
+async def transactions_connection() -> AsyncIterator[asyncpg.Connection]:
+    """Borrow a connection from the transactions pool for the duration of the block."""
+    pool = await get_transactions_pool()
+    async with pool.acquire() as conn:
+        yield conn
+
+@asynccontextmanager
+async def chats_connection() -> AsyncIterator[asyncpg.Connection]:
+    """Borrow a connection from the chats pool for the duration of the block."""
+    pool = await get_chats_pool()
+    async with pool.acquire() as conn:
+        yield conn
+
 # Backward compatibility function
 async def get_db_connection():
     """Get database connection for transactions (backward compatibility)."""
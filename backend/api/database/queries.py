@@ -1,9 +1,27 @@
 import asyncio
+import asyncpg
+import hashlib
 import re
-from typing import List, Dict, Any, Optional
+import sqlglot
+from functools import lru_cache
+from sqlglot import exp
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
+from cachetools import TTLCache
 from fastapi import HTTPException
-from .connection import get_transactions_db_connection
-from ..config import MAX_QUERY_RESULTS, DATABASE_TIMEOUT
+from .connection import transactions_connection
+from ..http_cache import bump_resource_version
+from ..config import (
+    MAX_QUERY_RESULTS, QUERY_STREAM_PREFETCH, DATABASE_TIMEOUT, QUERY_CACHE_TTL, QUERY_CACHE_MAX_ENTRIES,
+    QUERY_FIX_OFFLOAD_LENGTH,
+    CHART_SQL_CACHE_SIZE, CHART_MAX_BARS
+)
+
+# Results of read-only queries run through execute_query. The generation is
+# mixed into each key so a write invalidates every cached result at once.
+_query_cache: TTLCache = TTLCache(maxsize=QUERY_CACHE_MAX_ENTRIES, ttl=QUERY_CACHE_TTL)
+_query_cache_generation = 0
+_WRITE_STATEMENT = re.compile(r'\b(?:INSERT|UPDATE|DELETE)\b', re.IGNORECASE)
+_LIMIT_OR_COUNT = re.compile(r'\b(?:LIMIT|COUNT)\b', re.IGNORECASE)
 
 async def with_timeout(coro, timeout_seconds: float, operation_name: str):
     """Wrapper to add timeout to any async operation."""
@@ -15,61 +33,244 @@ async def with_timeout(coro, timeout_seconds: float, operation_name: str):
             detail=f"{operation_name} timed out. Please try a simpler query or check your connection."
         )
 
-def validate_and_fix_query(sql_query: str) -> str:
-    """Validate and attempt to fix common query issues."""
-    fixed_query = sql_query
-    
-    # Fix references to computed columns that don't exist in the table
-    common_fixes = [
+# Each rule is (keyword, compiled pattern, replacement); a rule can only match
+# when its keyword appears in the query
+_FIX_RULES = [
+    (keyword, re.compile(pattern, re.IGNORECASE), replacement) for keyword, pattern, replacement in [
+        # Fix references to computed columns that don't exist in the table
         # final_status column references
-        (r'SELECT\s+([^,]*,\s*)?final_status\b', r'SELECT \1CASE WHEN event_type = \'SettlementConfirmed\' THEN \'SUCCESSFUL\' ELSE \'FAILED\' END as final_status'),
-        (r'WHERE\s+final_status\s*=\s*[\'"](\w+)[\'"]', r'WHERE (CASE WHEN event_type = \'SettlementConfirmed\' THEN \'SUCCESSFUL\' ELSE \'FAILED\' END) = \'\1\''),
-        (r'ORDER BY\s+final_status\b', r'ORDER BY (CASE WHEN event_type = \'SettlementConfirmed\' THEN \'SUCCESSFUL\' ELSE \'FAILED\' END)'),
+        ('final_status', r'SELECT\s+([^,]*,\s*)?final_status\b', r'SELECT \1CASE WHEN event_type = \'SettlementConfirmed\' THEN \'SUCCESSFUL\' ELSE \'FAILED\' END as final_status'),
+        ('final_status', r'WHERE\s+final_status\s*=\s*[\'"](\w+)[\'"]', r'WHERE (CASE WHEN event_type = \'SettlementConfirmed\' THEN \'SUCCESSFUL\' ELSE \'FAILED\' END) = \'\1\''),
+        ('final_status', r'ORDER BY\s+final_status\b', r'ORDER BY (CASE WHEN event_type = \'SettlementConfirmed\' THEN \'SUCCESSFUL\' ELSE \'FAILED\' END)'),
         
         # Fix success_rate references
-        (r'WHERE\s+success_rate\s*[><=]', r'WHERE (SELECT success_rate FROM transaction_summary)'),
+        ('success_rate', r'WHERE\s+success_rate\s*[><=]', r'WHERE (SELECT success_rate FROM transaction_summary)'),
         
         # Fix common count references in WHERE clauses
-        (r'WHERE\s+count\s*[><=]', r'WHERE transaction_count'),
+        ('count', r'WHERE\s+count\s*[><=]', r'WHERE transaction_count'),
         
         # Fix references to non-existent transaction_summary table
-        (r'FROM\s+transaction_summary\b', r'FROM (WITH latest_events AS (SELECT *, ROW_NUMBER() OVER (PARTITION BY transaction_id ORDER BY timestamp::timestamptz DESC) as rn FROM transactions) SELECT COUNT(*) as total_transactions FROM latest_events WHERE rn = 1) as transaction_summary'),
+        ('transaction_summary', r'FROM\s+transaction_summary\b', r'FROM (WITH latest_events AS (SELECT *, ROW_NUMBER() OVER (PARTITION BY transaction_id ORDER BY timestamp::timestamptz DESC) as rn FROM transactions) SELECT COUNT(*) as total_transactions FROM latest_events WHERE rn = 1) as transaction_summary'),
+        
+        # Ensure all timestamp references are properly cast
+        ('timestamp', r'\btimestamp\s*([><=]+)\s*([^:]+?)(?=\s|$|;|\))', r'timestamp::timestamptz \1 \2'),
+        ('timestamp', r'ORDER BY\s+timestamp\b(?!::)', r'ORDER BY timestamp::timestamptz'),
+        ('timestamp', r'GROUP BY\s+timestamp\b(?!::)', r'GROUP BY timestamp::timestamptz'),
     ]
+]
+
+_FIX_KEYWORDS = {keyword for keyword, _, _ in _FIX_RULES}
+
+def _find_fix_keywords(text: str) -> set:
+    """Return the rule keywords that occur in the text, ignoring case."""
+    lowered = text.lower()
+    return {keyword for keyword in _FIX_KEYWORDS if keyword in lowered}
+
+# Keywords each rule's replacement introduces, so later rules still see this rule's output
+_FIX_RULE_OUTPUT_KEYWORDS = [_find_fix_keywords(replacement) for _, _, replacement in _FIX_RULES]
+
+# Rule keywords whose rewrites _fix_query_ast applies when the query parses
+_AST_FIX_KEYWORDS = frozenset({'final_status', 'timestamp'})
+_FINAL_STATUS_EXPR = sqlglot.parse_one("CASE WHEN event_type = 'SettlementConfirmed' THEN 'SUCCESSFUL' ELSE 'FAILED' END", read='postgres')
+# Parents under which a bare timestamp column must be cast to compare or sort correctly
+_TIMESTAMP_CAST_PARENTS = (exp.EQ, exp.NEQ, exp.GT, exp.GTE, exp.LT, exp.LTE, exp.Between, exp.Ordered, exp.Group)
+
+def _fix_query_ast(sql_query: str) -> Optional[str]:
+    """Apply the final_status and timestamp fixes to the parsed query.
     
-    for pattern, replacement in common_fixes:
-        fixed_query = re.sub(pattern, replacement, fixed_query, flags=re.IGNORECASE)
+    Returns None if the query isn't a single statement sqlglot can parse, and
+    the original text unchanged if nothing needed fixing."""
+    try:
+        statements = sqlglot.parse(sql_query, read='postgres')
+    except sqlglot.errors.SqlglotError:
+        return None
+    if len(statements) != 1 or statements[0] is None:
+        return None
     
-    # Ensure all timestamp references are properly cast
-    timestamp_fixes = [
-        (r'\btimestamp\s*([><=]+)\s*([^:]+?)(?=\s|$|;|\))', r'timestamp::timestamptz \1 \2'),
-        (r'ORDER BY\s+timestamp\b(?!::)', r'ORDER BY timestamp::timestamptz'),
-        (r'GROUP BY\s+timestamp\b(?!::)', r'GROUP BY timestamp::timestamptz'),
-    ]
+    tree = statements[0]
+    # A final_status the query defines itself (e.g. in a CTE) is a real column
+    defines_final_status = any(alias.alias == 'final_status' for alias in tree.find_all(exp.Alias))
+    changed = False
+    
+    for column in list(tree.find_all(exp.Column)):
+        if column.name == 'final_status' and not column.table and not defines_final_status:
+            replacement = _FINAL_STATUS_EXPR.copy()
+            if isinstance(column.parent, exp.Select):
+                replacement = exp.alias_(replacement, 'final_status')
+            column.replace(replacement)
+            changed = True
+        elif column.name == 'timestamp' and isinstance(column.parent, _TIMESTAMP_CAST_PARENTS):
+            column.replace(exp.cast(column.copy(), 'timestamptz'))
+            changed = True
+    
+    return tree.sql(dialect='postgres') if changed else sql_query
+
+@lru_cache(maxsize=CHART_SQL_CACHE_SIZE)
+def chart_sql_from_ast(sql_query: str) -> Optional[Tuple[Optional[str], Optional[str], str]]:
+    """Derive a bar chart from a query that groups by one expression and aggregates.
+    
+    Returns (x column, y column, chart SQL) where the chart SQL selects the group
+    expression as x and the first aggregate as y, in the query's own order (largest
+    bars first if it has none) and no more rows than the query's LIMIT. The column
+    names are the query's own result names for the two, or None where the query
+    doesn't name them, so its rows can be charted without running the chart SQL.
+    Returns None if the query doesn't have that shape."""
+    try:
+        statements = sqlglot.parse(sql_query, read='postgres')
+    except sqlglot.errors.SqlglotError:
+        return None
+    if len(statements) != 1 or not isinstance(statements[0], exp.Select):
+        return None
+    
+    tree = statements[0]
+    group = tree.args.get('group')
+    if group is None or len(group.expressions) != 1 or tree.find(exp.Window):
+        return None
     
-    for pattern, replacement in timestamp_fixes:
-        fixed_query = re.sub(pattern, replacement, fixed_query, flags=re.IGNORECASE)
+    projections = tree.expressions
+    group_expr = group.expressions[0]
+    if isinstance(group_expr, exp.Literal) and group_expr.is_int:
+        # GROUP BY 1 refers to the first projection
+        position = int(group_expr.name) - 1
+        if not 0 <= position < len(projections):
+            return None
+        group_expr = projections[position].unalias()
+    elif isinstance(group_expr, exp.Column) and not group_expr.table:
+        # GROUP BY day may name a projection's alias rather than a table column
+        aliased = next((p for p in projections if isinstance(p, exp.Alias) and p.alias == group_expr.name), None)
+        if aliased is not None:
+            group_expr = aliased.unalias()
+    
+    x_projection = next((p for p in projections if p.unalias() == group_expr), None)
+    y_projection = next((p for p in projections if p.find(exp.AggFunc)), None)
+    if y_projection is None:
+        return None
+    
+    chart_tree = tree.copy()
+    chart_tree.select(
+        exp.alias_(group_expr.copy(), 'x'),
+        exp.alias_(y_projection.unalias().copy(), 'y'),
+        append=False,
+        copy=False
+    )
+    chart_tree.group_by(group_expr.copy(), append=False, copy=False)
+    
+    # Keep the query's own ordering (e.g. a daily series by date), re-pointed at
+    # the chart columns since the projections it may refer to are gone
+    order = chart_tree.args.get('order')
+    if order is None:
+        chart_tree.order_by('y DESC', append=False, copy=False)
+    else:
+        for ordered in order.expressions:
+            ordered.set('this', _chart_order_expression(ordered.this, projections, x_projection, y_projection))
+    
+    # Never show more bars than the query returns rows
+    limit = tree.args.get('limit')
+    limit_value = limit.expression if limit is not None else None
+    if isinstance(limit_value, exp.Literal) and limit_value.is_int:
+        chart_tree.limit(min(int(limit_value.name), CHART_MAX_BARS), copy=False)
+    else:
+        chart_tree.limit(CHART_MAX_BARS, copy=False)
+    
+    return _output_name(x_projection), _output_name(y_projection), chart_tree.sql(dialect='postgres')
+
+def _chart_order_expression(expression: exp.Expression, projections: List[exp.Expression],
+                            x_projection: Optional[exp.Expression], y_projection: exp.Expression) -> exp.Expression:
+    """Rewrite an ORDER BY expression of the original query for the chart query.
+    Ordinals and output names of the original projections become x, y or the projected expression."""
+    projection = None
+    if isinstance(expression, exp.Literal) and expression.is_int:
+        position = int(expression.name) - 1
+        if 0 <= position < len(projections):
+            projection = projections[position]
+    elif isinstance(expression, exp.Column) and not expression.table:
+        projection = next((p for p in projections if _output_name(p) == expression.name), None)
+    
+    if projection is None:
+        return expression.copy()
+    if projection is x_projection:
+        return exp.column('x')
+    if projection is y_projection:
+        return exp.column('y')
+    return projection.unalias().copy()
+
+def _output_name(projection: Optional[exp.Expression]) -> Optional[str]:
+    """The result column name of an aliased or plain column projection, None for anything else."""
+    if isinstance(projection, exp.Alias):
+        return projection.alias
+    if isinstance(projection, exp.Column):
+        return projection.name
+    return None
+
+def validate_and_fix_query(sql_query: str) -> str:
+    """Validate and attempt to fix common query issues."""
+    # The parser handles the common final_status and timestamp fixes; the
+    # regex rules cover the rest, or everything if the query doesn't parse
+    fixed_query = _fix_query_ast(sql_query)
+    skipped_keywords = _AST_FIX_KEYWORDS
+    if fixed_query is None:
+        fixed_query = sql_query
+        skipped_keywords = frozenset()
+    keywords = _find_fix_keywords(fixed_query) - skipped_keywords
+    
+    for (keyword, pattern, replacement), output_keywords in zip(_FIX_RULES, _FIX_RULE_OUTPUT_KEYWORDS):
+        if keyword not in keywords:
+            continue
+        fixed_query, count = pattern.subn(replacement, fixed_query)
+        if count:
+            keywords |= output_keywords - skipped_keywords
     
     return fixed_query
 
-async def execute_query(sql_query: str) -> List[Dict[str, Any]]:
-    """Execute SQL query with timeout and result limiting."""
-    conn = None
+async def validate_and_fix_query_async(sql_query: str) -> str:
+    """Run validate_and_fix_query, in a worker thread for queries long enough to stall the event loop."""
+    if len(sql_query) <= QUERY_FIX_OFFLOAD_LENGTH:
+        return validate_and_fix_query(sql_query)
+    return await asyncio.get_running_loop().run_in_executor(None, validate_and_fix_query, sql_query)
+
+def invalidate_query_cache():
+    """Invalidate all cached execute_query results after data has been written."""
+    global _query_cache_generation
+    _query_cache_generation += 1
+
+def _query_cache_key(sql_query: str, args: tuple = ()) -> bytes:
+    """Build the cache key for a query and its arguments in the current cache generation."""
+    return hashlib.blake2b(f"{_query_cache_generation}:{sql_query}:{args!r}".encode(), digest_size=16).digest()
+
+def _limit_query(sql_query: str) -> str:
+    """Add LIMIT to prevent memory issues if not already present."""
+    if not _LIMIT_OR_COUNT.search(sql_query):
+        return f"{sql_query.rstrip(';')} LIMIT {MAX_QUERY_RESULTS};"
+    return sql_query
+
+async def execute_query(sql_query: str, *args) -> List[Dict[str, Any]]:
+    """Execute SQL query with timeout and result limiting.
+    
+    Values for $1-style placeholders are passed as extra arguments, so the
+    query text stays the same across calls and its prepared plan is reused.
+    Results of read-only queries are cached for QUERY_CACHE_TTL seconds, so
+    callers must not modify the returned rows."""
     try:
-        conn = await get_transactions_db_connection()
+        limited_query = _limit_query(sql_query)
         
-        # Add LIMIT to prevent memory issues if not already present
-        limited_query = sql_query
-        if "LIMIT" not in sql_query.upper() and "COUNT" not in sql_query.upper():
-            limited_query = f"{sql_query.rstrip(';')} LIMIT {MAX_QUERY_RESULTS};"
+        # Computed before running the query so a write that lands meanwhile invalidates this result
+        cache_key = None if _WRITE_STATEMENT.search(limited_query) else _query_cache_key(limited_query, args)
+        if cache_key is not None:
+            cached = _query_cache.get(cache_key)
+            if cached is not None:
+                return cached
         
-        # Execute with timeout
-        rows = await with_timeout(
-            conn.fetch(limited_query),
-            DATABASE_TIMEOUT,
-            "Database query execution"
-        )
+        async with transactions_connection() as conn:
+            # Execute with timeout
+            rows = await with_timeout(
+                conn.fetch(limited_query, *args),
+                DATABASE_TIMEOUT,
+                "Database query execution"
+            )
         
         result = [dict(row) for row in rows]
+        if cache_key is not None:
+            _query_cache[cache_key] = result
         return result
         
     except asyncio.TimeoutError:
@@ -89,187 +290,135 @@ async def execute_query(sql_query: str) -> List[Dict[str, Any]]:
                 )
         
         raise HTTPException(status_code=500, detail=f"Failed to execute query: {str(e)}")
-    finally:
-        # Close the connection properly
-        if conn is not None:
-            try:
-                await conn.close()
-            except Exception:
-                pass
+
+async def stream_query(sql_query: str) -> AsyncIterator[asyncpg.Record]:
+    """Stream rows of a read-only query through a server-side cursor.
+    
+    Rows are fetched QUERY_STREAM_PREFETCH at a time, so memory stays bounded
+    by the prefetch size rather than the result size. Results are not cached."""
+    async with transactions_connection() as conn:
+        async with conn.transaction(readonly=True):
+            async for record in conn.cursor(_limit_query(sql_query), prefetch=QUERY_STREAM_PREFETCH):
+                yield record
 
 async def test_transactions_db_connection():
     """Test transactions database connectivity."""
-    conn = None
     try:
-        conn = await get_transactions_db_connection()
-        await conn.fetchval("SELECT 1")
+        async with transactions_connection() as conn:
+            await conn.fetchval("SELECT 1")
         return "connected"
     except Exception as e:
         return f"error: {str(e)[:50]}"
-    finally:
-        if conn is not None:
-            try:
-                await conn.close()
-            except Exception:
-                pass 
 
 
 # --- Dashboard Database Operations ---
 
 async def create_dashboard_in_db(dashboard_id: str, title: str) -> Optional[Dict[str, Any]]:
     """Create a new dashboard in the database."""
-    conn = None
     try:
-        conn = await get_transactions_db_connection()
-        
         query = """
             INSERT INTO dashboards (id, title, charts_count, created_at, updated_at)
             VALUES ($1, $2, 0, NOW(), NOW())
             RETURNING id, title, charts_count, created_at, updated_at
         """
         
-        result = await with_timeout(
-            conn.fetchrow(query, dashboard_id, title),
-            DATABASE_TIMEOUT,
-            "Create dashboard"
-        )
+        async with transactions_connection() as conn:
+            result = await with_timeout(
+                conn.fetchrow(query, dashboard_id, title),
+                DATABASE_TIMEOUT,
+                "Create dashboard"
+            )
+        
+        if not result:
+            return None
         
-        return dict(result) if result else None
+        bump_resource_version("dashboards")
+        return dict(result)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create dashboard: {str(e)}")
-    finally:
-        if conn is not None:
-            try:
-                await conn.close()
-            except Exception:
-                pass
 
 async def add_chart_to_dashboard_in_db(chart_id: str, dashboard_id: str, chart_title: str, chart_data: Any) -> Optional[Dict[str, Any]]:
-    """Add a chart to a dashboard in the database."""
-    conn = None
+    """Add a chart to a dashboard in the database. Raises a 404 if the dashboard doesn't exist."""
     try:
-        conn = await get_transactions_db_connection()
-        
-        # Start transaction
-        async with conn.transaction():
-            # Insert chart
-            insert_chart_query = """
-                INSERT INTO dashboard_charts (id, dashboard_id, chart_title, chart_data, created_at)
-                VALUES ($1, $2, $3, $4, NOW())
-                RETURNING id, dashboard_id, chart_title, chart_data, created_at
-            """
-            
-            chart_result = await with_timeout(
-                conn.fetchrow(insert_chart_query, chart_id, dashboard_id, chart_title, chart_data),
-                DATABASE_TIMEOUT,
-                "Insert chart"
-            )
-            
-            # Update dashboard charts count
-            update_dashboard_query = """
+        # Update dashboard charts count and insert chart in one atomic statement;
+        # no updated dashboard row means nothing is inserted
+        add_chart_query = """
+            WITH updated_dashboard AS (
                 UPDATE dashboards 
                 SET charts_count = charts_count + 1, updated_at = NOW()
-                WHERE id = $1
-            """
-            
-            await with_timeout(
-                conn.execute(update_dashboard_query, dashboard_id),
+                WHERE id = $2
+                RETURNING id
+            )
+            INSERT INTO dashboard_charts (id, dashboard_id, chart_title, chart_data, created_at)
+            SELECT $1, id, $3, $4, NOW() FROM updated_dashboard
+            RETURNING id, dashboard_id, chart_title, chart_data, created_at
+        """
+        
+        async with transactions_connection() as conn:
+            chart_result = await with_timeout(
+                conn.fetchrow(add_chart_query, chart_id, dashboard_id, chart_title, chart_data),
                 DATABASE_TIMEOUT,
-                "Update dashboard count"
+                "Add chart to dashboard"
             )
-            
-            return dict(chart_result) if chart_result else None
         
+        if not chart_result:
+            raise HTTPException(status_code=404, detail=f"Dashboard {dashboard_id} not found")
+        
+        bump_resource_version("dashboards")
+        return dict(chart_result)
+        
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to add chart to dashboard: {str(e)}")
-    finally:
-        if conn is not None:
-            try:
-                await conn.close()
-            except Exception:
-                pass
 
-async def get_all_dashboards_from_db() -> List[Dict[str, Any]]:
-    """Get all dashboards from the database."""
-    conn = None
+async def get_all_dashboards_from_db() -> List[asyncpg.Record]:
+    """Get all dashboards from the database.
+    Rows are returned as asyncpg Records, which support key access like dicts."""
     try:
-        conn = await get_transactions_db_connection()
-        
         query = """
             SELECT id, title, charts_count, created_at, updated_at
             FROM dashboards
             ORDER BY updated_at DESC
         """
         
-        rows = await with_timeout(
-            conn.fetch(query),
-            DATABASE_TIMEOUT,
-            "Get all dashboards"
-        )
+        async with transactions_connection() as conn:
+            rows = await with_timeout(
+                conn.fetch(query),
+                DATABASE_TIMEOUT,
+                "Get all dashboards"
+            )
         
-        return [dict(row) for row in rows]
+        return rows
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get dashboards: {str(e)}")
-    finally:
-        if conn is not None:
-            try:
-                await conn.close()
-            except Exception:
-                pass
 
-async def get_dashboard_charts_from_db(dashboard_id: str) -> List[Dict[str, Any]]:
-    """Get all charts for a specific dashboard from the database."""
-    conn = None
+async def get_dashboard_charts_from_db(dashboard_id: str) -> Optional[List[asyncpg.Record]]:
+    """Get all charts for a specific dashboard from the database, or None if the dashboard doesn't exist.
+    Rows are returned as asyncpg Records, which support key access like dicts."""
     try:
-        conn = await get_transactions_db_connection()
-        
+        # The dashboard row anchors the join, so a dashboard without charts still
+        # returns one row and existence is known from the same round-trip
         query = """
-            SELECT id as chart_id, dashboard_id, chart_title, chart_data, created_at
-            FROM dashboard_charts
-            WHERE dashboard_id = $1
-            ORDER BY created_at ASC
+            SELECT c.id as chart_id, d.id as dashboard_id, c.chart_title, c.chart_data, c.created_at
+            FROM dashboards d
+            LEFT JOIN dashboard_charts c ON c.dashboard_id = d.id
+            WHERE d.id = $1
+            ORDER BY c.created_at ASC
         """
         
-        rows = await with_timeout(
-            conn.fetch(query, dashboard_id),
-            DATABASE_TIMEOUT,
-            "Get dashboard charts"
-        )
+        async with transactions_connection() as conn:
+            rows = await with_timeout(
+                conn.fetch(query, dashboard_id),
+                DATABASE_TIMEOUT,
+                "Get dashboard charts"
+            )
         
-        return [dict(row) for row in rows]
+        if not rows:
+            return None
+        return [row for row in rows if row['chart_id'] is not None]
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get dashboard charts: {str(e)}")
-    finally:
-        if conn is not None:
-            try:
-                await conn.close()
-            except Exception:
-                pass
-
-async def dashboard_exists_in_db(dashboard_id: str) -> bool:
-    """Check if a dashboard exists in the database."""
-    conn = None
-    try:
-        conn = await get_transactions_db_connection()
-        
-        query = "SELECT 1 FROM dashboards WHERE id = $1"
-        
-        result = await with_timeout(
-            conn.fetchval(query, dashboard_id),
-            DATABASE_TIMEOUT,
-            "Check dashboard exists"
-        )
-        
-        return result is not None
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to check dashboard existence: {str(e)}")
-    finally:
-        if conn is not None:
-            try:
-                await conn.close()
-            except Exception:
-                pass
\ No newline at end of file
@@ -0,0 +1,49 @@
+import hashlib
+import secrets
+from typing import Dict, Optional
+from fastapi import Request, Response
+
+# Cache-Control for conditional GETs: clients may store responses but must revalidate
+ETAG_CACHE_CONTROL = "no-cache"
+
+# Written on every change to a resource the API owns, so its ETag can be
+# checked before touching the database. The per-process token keeps ETags
+# issued before a restart from matching the reset counters.
+_BOOT_TOKEN = secrets.token_hex(4)
+_resource_versions: Dict[str, int] = {}
+
+def bump_resource_version(resource: str):
+    """Mark a resource as changed so its previously issued ETags no longer match."""
+    _resource_versions[resource] = _resource_versions.get(resource, 0) + 1
+
+def resource_etag(resource: str) -> str:
+    """ETag for the current version of a resource."""
+    return f'"{resource}-{_BOOT_TOKEN}-{_resource_versions.get(resource, 0)}"'
+
+def content_etag(body: bytes) -> str:
+    """ETag derived from a response body."""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """Return a 304 response if the client already holds this ETag."""
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": ETAG_CACHE_CONTROL})
+    return None
+
+def with_etag(request: Request, response: Response, etag: Optional[str] = None) -> Response:
+    """Tag a response with an ETag, hashing its body if none is given, or replace it with a 304."""
+    etag = etag or content_etag(response.body)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = ETAG_CACHE_CONTROL
+    return response
@@ -3,6 +3,10 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .config import validate_environment, CORS_ORIGINS, CORS_HEADERS, CORS_EXPOSE_HEADERS
 from .controllers import chat_controller, transaction_controller, dashboard_controller
+from .responses import ApiJSONResponse
+from .database.connection import init_db_pools, close_db_pools
+from .chat.manager import start_alert_writer, stop_alert_writer, flush_chat_writes
+from .ai.batcher import start_query_type_batcher, stop_query_type_batcher
 
 # Validate environment variables
 validate_environment()
@@ -13,7 +17,8 @@ app = FastAPI(
     description="REST API for React frontend to analyze transaction data with AI",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ApiJSONResponse
 )
 
 # Add CORS middleware for React development and production
@@ -34,15 +39,20 @@ app.include_router(dashboard_controller.router, prefix="/dashboards", tags=["Das
 
 # --- API Startup/Shutdown Events ---
 
-# @app.on_event("startup")
-# async def startup_event():
-#     """Initialize services on startup."""
-#     await init_db_pools()
-
-# @app.on_event("shutdown")
-# async def shutdown_event():
-#     """Cleanup on shutdown."""
-#     await close_db_pools()
+@app.on_event("startup")
+async def startup_event():
+    """Initialize services on startup."""
+    await init_db_pools()
+    start_alert_writer()
+    start_query_type_batcher()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Cleanup on shutdown."""
+    await stop_query_type_batcher()
+    await stop_alert_writer()
+    await flush_chat_writes()
+    await close_db_pools()
 
 if __name__ == "__main__":
     print("🚀 Starting API on http://127.0.0.1:8001")
@@ -112,6 +112,10 @@ class QueryTypeResponse(BaseModel):
     """Model for the query type response."""
     query_type: str = Field(..., description="The type of query to be executed")
 
+class QueryTypeBatchResponse(BaseModel):
+    """Model for the batched query type response."""
+    query_types: List[str] = Field(..., description="The type of each query, in the order the queries were given")
+
 class FailedTransactionRetryResponse(BaseModel):
     """Model for the failed transaction retry response."""
     summary: str = Field(..., description="The summary with all the steps to fix the failed transaction")
@@ -126,10 +130,26 @@ class BarChartResponse(BaseModel):
     reason: Optional[str] = Field(None, description="Reason why bar chart is not suitable when chart_possible is false")
 
 
+class FusedAnalysisResponse(BaseModel):
+    """Model for the combined data summary, bar chart analysis and response summary step."""
+    summary: str = Field(..., description="Comprehensive summary of the data")
+    key_insights: List[str] = Field(..., description="Key insights from the data")
+    transaction_status: Optional[str] = None
+    recommendation: Optional[str] = None
+    chart_possible: bool = Field(False, description="Whether a bar chart can be generated from the data")
+    xlabel: Optional[str] = Field(None, description="Label for the x-axis when chart is possible")
+    ylabel: Optional[str] = Field(None, description="Label for the y-axis when chart is possible")
+    modified_sql: Optional[str] = Field(None, description="Modified SQL query that returns x,y format when chart is possible")
+    reason: Optional[str] = Field(None, description="Reason why bar chart is not suitable when chart_possible is false")
+    response_summary: str = Field(..., description="Condensed summary of the whole response for future conversation context")
+    metadata: str = Field(..., description="key metadata extracted of the response")
+
+
 class GrafanaWebhookRequest(BaseModel):
     """Model for the grafana webhook request."""
     state: str = Field(..., description="The state of the transaction")
     message: str = Field(..., description="The message of the transaction")
+    labels: Optional[Dict[str, str]] = Field(None, description="Alert labels, which may carry the transaction_id")
 
 
 # --- Dashboard Models ---
@@ -0,0 +1,61 @@
+from decimal import Decimal
+from typing import Any, AsyncGenerator, Mapping, Optional
+import orjson
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+def _orjson_default(value: Any) -> Any:
+    """Serialize values orjson doesn't handle natively, matching jsonable_encoder."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, BaseModel):
+        return dict(value)
+    return str(value)
+
+class ApiJSONResponse(ORJSONResponse):
+    """ORJSONResponse that also serializes Decimal values from asyncpg rows."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_orjson_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+
+def api_response(success: bool, message: str, data: Optional[Any] = None, error: Optional[str] = None) -> ApiJSONResponse:
+    """Build an ApiResponse-shaped body directly, skipping Pydantic validation and jsonable_encoder."""
+    return ApiJSONResponse({
+        "success": success,
+        "message": message,
+        "data": data,
+        "error": error
+    })
+
+def model_response(model: BaseModel) -> ApiJSONResponse:
+    """Encode a model's fields straight to JSON bytes, skipping FastAPI's response_model
+    validation and serialization. Nested models are encoded field by field as well."""
+    return ApiJSONResponse(dict(model))
+
+async def stream_api_response(message: str, rows: AsyncGenerator[Mapping[str, Any], None]) -> StreamingResponse:
+    """Stream an ApiResponse-shaped body whose data is a list of rows, encoding one row at a time.
+    
+    The first row is fetched before the response starts, so query errors still
+    reach the caller's error handling instead of truncating the body."""
+    try:
+        first = await rows.__anext__()
+    except StopAsyncIteration:
+        first = None
+    
+    async def body():
+        try:
+            yield b'{"success":true,"message":' + orjson.dumps(message) + b',"data":['
+            if first is not None:
+                yield orjson.dumps(dict(first), default=_orjson_default)
+                async for row in rows:
+                    yield b',' + orjson.dumps(dict(row), default=_orjson_default)
+            yield b'],"error":null}'
+        finally:
+            # Release the cursor's connection promptly if the client disconnects
+            await rows.aclose()
+    
+    return StreamingResponse(body(), media_type="application/json")
@@ -1,22 +1,42 @@
 
-import json
-from datetime import datetime
+import orjson
+import time
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
 from fastapi import HTTPException
+from pydantic_ai.messages import ModelResponse, TextPart
 from ..models.schemas import (
     ChatQueryRequest, ChatResponse, QueryResponse,
-    ApiResponse, ChatHistory, SQLGenerationResponse, DataSummaryResponse
+    ApiResponse, ChatHistory, SQLGenerationResponse, DataSummaryResponse, FusedAnalysisResponse
 )
-from ..ai.agents import sql_agent, summary_agent, response_summary_agent, query_type_agent, bar_chart_agent
-from ..database.queries import execute_query, validate_and_fix_query, with_timeout
+from ..ai.agents import sql_agent, summary_agent, response_summary_agent, fused_analysis_agent
+from ..ai.batcher import classify_query_type
+from ..database.queries import execute_query, validate_and_fix_query_async, with_timeout, chart_sql_from_ast
 from ..chat.manager import (
     create_new_chat, update_chat_history, load_chat_messages_from_db,
     get_all_chats_from_db, load_chat_history_from_db, delete_chat_from_db,
     chat_exists_in_db, delete_chat_from_memory, save_chat_query
 )
-from ..config import TRANSACTION_COLUMNS, AI_AGENT_TIMEOUT
+from ..config import TRANSACTION_COLUMNS_JSON, AI_AGENT_TIMEOUT, CHART_MAX_BARS
+from .semantic_cache import lookup_cached_response, cache_response
+
+logger = logging.getLogger(__name__)
+
+# Rows of a query result shown to the analysis agent
+_SUMMARY_ROWS = 50
+
+_DATA_CONTEXT = """
+                Original Query: {query}
+                SQL Query: {sql_query}
+                Retrieved Data ({total} rows, showing first {shown}):
+                {rows}
+                {truncated}
+                Total rows: {total}
+                """
 
 async def handle_chat_query_service(request: ChatQueryRequest):
-    start_time = datetime.now()
+    start_ns = time.perf_counter_ns()
     
     try:
         if request.chat_type == "new":
@@ -29,19 +49,39 @@ async def handle_chat_query_service(request: ChatQueryRequest):
             chat_id = request.chat_id
             
             from ..chat.manager import chat_message_cache
-            chat_exists = await chat_exists_in_db(chat_id) or chat_id in chat_message_cache
-            if not chat_exists:
-                raise HTTPException(status_code=404, detail=f"Chat {chat_id} not found")
+            # A chat in memory exists and already holds the history from its last turn
+            message_history = chat_message_cache.get(chat_id)
+            if message_history is None:
+                # Load the history while checking the chat exists; both are independent reads
+                exists_in_db, message_history = await asyncio.gather(
+                    chat_exists_in_db(chat_id),
+                    load_chat_messages_from_db(chat_id)
+                )
+                if not exists_in_db:
+                    # Loading caches an entry for the chat, so drop it again
+                    delete_chat_from_memory(chat_id)
+                    raise HTTPException(status_code=404, detail=f"Chat {chat_id} not found")
             
-            message_history = await load_chat_messages_from_db(chat_id)
+            # Repeated questions in the same chat reuse the earlier answer
+            cached_response = await lookup_cached_response(chat_id, request.query)
+            if cached_response is not None:
+                chat_response = cached_response.model_copy(update={
+                    "query": request.query,
+                    "execution_time_ms": (time.perf_counter_ns() - start_ns) / 1e6
+                })
+                try:
+                    await update_chat_history(chat_id, message_history, request.query, chat_response, chat_response.response_summary)
+                except Exception:
+                    pass
+                return chat_response
         
         try:
-            query_type_result = await with_timeout(
-                query_type_agent.run(request.query, message_history=message_history if message_history else []),
+            # Concurrent queries are classified together in batches
+            query_type = await with_timeout(
+                classify_query_type(request.query, message_history if message_history else []),
                 AI_AGENT_TIMEOUT,
                 "Query type classification"
             )
-            query_type = query_type_result.data.query_type
         except HTTPException as e:
             if e.status_code == 408:
                 query_type = "sql"
@@ -51,11 +91,12 @@ async def handle_chat_query_service(request: ChatQueryRequest):
             query_type = "sql"
         
         if query_type == "simple":
-            return await handle_simple_llm_query_service(request, chat_id, message_history, start_time)
+            return await handle_simple_llm_query_service(request, chat_id, message_history, start_ns)
         
+        # The fixed schema block goes first so the prompt shares a stable prefix across requests
         augmented_query = f"""
+        Available Dataset Columns: {TRANSACTION_COLUMNS_JSON}
         User Query: {request.query}
-        Available Dataset Columns: {json.dumps(TRANSACTION_COLUMNS, indent=2)}
         Please generate a PostgreSQL query to answer this question.
         """
         
@@ -82,7 +123,7 @@ async def handle_chat_query_service(request: ChatQueryRequest):
         
         sql_response: SQLGenerationResponse = sql_result.data
         
-        validated_query = validate_and_fix_query(sql_response.sql_query)
+        validated_query = await validate_and_fix_query_async(sql_response.sql_query)
         if validated_query != sql_response.sql_query:
             sql_response.sql_query = validated_query
         
@@ -96,75 +137,43 @@ async def handle_chat_query_service(request: ChatQueryRequest):
                     "Fresh SQL generation"
                 )
                 fresh_sql_response: SQLGenerationResponse = fresh_sql_result.data
-                fresh_validated_query = validate_and_fix_query(fresh_sql_response.sql_query)
+                fresh_validated_query = await validate_and_fix_query_async(fresh_sql_response.sql_query)
                 
                 data = await execute_query(fresh_validated_query)
                 sql_response.sql_query = fresh_validated_query
             else:
                 raise
         
+        analysis: Optional[FusedAnalysisResponse] = None
+        # Degraded answers (timeouts, failed summaries or chart queries) aren't cached
+        cacheable = True
         try:
             if data:
-                summary_data = data[:50] if len(data) > 50 else data
-                data_context = f"""
-                Original Query: {request.query}
-                Retrieved Data ({len(data)} rows, showing first {len(summary_data)}):
-                {json.dumps(summary_data, indent=2, default=str)}
-                {"... (additional rows truncated for analysis)" if len(data) > 50 else ""}
-                Total rows: {len(data)}
-                """
+                summary_data = data[:_SUMMARY_ROWS]
+                total, shown = len(data), len(summary_data)
+                data_context = _DATA_CONTEXT.format(
+                    query=request.query,
+                    sql_query=sql_response.sql_query,
+                    total=total,
+                    shown=shown,
+                    rows=orjson.dumps(summary_data, default=str, option=orjson.OPT_SORT_KEYS).decode(),
+                    truncated="... (additional rows truncated for analysis)" if total > shown else ""
+                )
                 
-                summary_result = await with_timeout(
-                    summary_agent.run(data_context, message_history=sql_result.all_messages()),
+                # One call returns the data summary, bar chart analysis and response summary
+                analysis_result = await with_timeout(
+                    fused_analysis_agent.run(data_context, message_history=sql_result.all_messages()),
                     AI_AGENT_TIMEOUT,
-                    "AI summary generation"
+                    "AI analysis generation"
                 )
-                summary_response: DataSummaryResponse = summary_result.data
-                
-                # Check if data can be visualized as bar chart
-                try:
-                    bar_chart_context = f"""
-                    User Query: {request.query}
-                    SQL Query: {sql_response.sql_query}
-                    """
-                    
-                    bar_chart_result = await with_timeout(
-                        bar_chart_agent.run(bar_chart_context),
-                        AI_AGENT_TIMEOUT,
-                        "Bar chart analysis"
-                    )
-                    bar_chart_response = bar_chart_result.data
-                    print(f"Bar chart analysis: {bar_chart_response}")
-                    
-                    # Convert to dict to allow adding chart_data
-                    if bar_chart_response:
-                        if hasattr(bar_chart_response, 'dict'):
-                            bar_chart_response = bar_chart_response.dict()
-                        elif hasattr(bar_chart_response, '__dict__'):
-                            bar_chart_response = bar_chart_response.__dict__.copy()
-                    
-                    # Execute modified SQL if chart is possible and modified_sql is provided
-                    if (bar_chart_response and 
-                        bar_chart_response.get('chart_possible') and
-                        bar_chart_response.get('modified_sql')):
-                        
-                        try:
-                            validated_chart_query = validate_and_fix_query(bar_chart_response['modified_sql'])
-                            chart_data = await execute_query(validated_chart_query)
-                            print(chart_data)
-                            
-                            # Add the chart data to the dict
-                            bar_chart_response['chart_data'] = chart_data
-                            print(bar_chart_response)
-                            print(f"Chart data executed successfully: {len(chart_data)} rows")
-                        except Exception as chart_e:
-                            print(f"Failed to execute chart SQL: {str(chart_e)}")
-                            # Add error info to the dict
-                            bar_chart_response['chart_data_error'] = str(chart_e)
-                                
-                except Exception as e:
-                    print(f"Bar chart analysis failed: {str(e)}")
-                    bar_chart_response = None
+                analysis = analysis_result.data
+                summary_response = DataSummaryResponse.model_construct(
+                    summary=analysis.summary,
+                    key_insights=analysis.key_insights,
+                    recommendation=analysis.recommendation,
+                    transaction_status=analysis.transaction_status
+                )
+                all_messages = analysis_result.all_messages()
             else:
                 summary_response = DataSummaryResponse(
                     summary="No data found matching the query criteria.",
@@ -173,11 +182,10 @@ async def handle_chat_query_service(request: ChatQueryRequest):
                     transaction_status=None
                 )
                 
-                summary_result = await with_timeout(
-                    summary_agent.run("No data found for the query.", message_history=sql_result.all_messages()),
-                    AI_AGENT_TIMEOUT,
-                    "AI summary generation"
-                )
+                # Record the canned summary as the model's reply instead of asking the agent for one
+                all_messages = sql_result.all_messages() + [
+                    ModelResponse(parts=[TextPart(content=summary_response.summary)])
+                ]
         except HTTPException as e:
             if e.status_code == 408:
                 summary_response = DataSummaryResponse(
@@ -186,13 +194,15 @@ async def handle_chat_query_service(request: ChatQueryRequest):
                     recommendation="Data retrieved successfully. Summary generation timed out.",
                     transaction_status=None
                 )
-                summary_result = sql_result
+                all_messages = sql_result.all_messages()
+                cacheable = False
             else:
                 raise
         
-        execution_time = (datetime.now() - start_time).total_seconds() * 1000
-        print(bar_chart_response)
-        chat_response = ChatResponse(
+        bar_chart_response = await _fetch_bar_chart(analysis, sql_response.sql_query, data) if data else None
+        
+        execution_time = (time.perf_counter_ns() - start_ns) / 1e6
+        chat_response = ChatResponse.model_construct(
             success=True,
             chat_id=chat_id,
             query=request.query,
@@ -208,37 +218,47 @@ async def handle_chat_query_service(request: ChatQueryRequest):
         )
 
         response_summary = None
-        try:
-            response_context = f"""
-            User Query: {request.query}
-            SQL Query: {sql_response.sql_query}
-            Data Summary: {summary_response.summary}
-            Key Insights: {', '.join(summary_response.key_insights)}
-            Recommendation: {summary_response.recommendation or 'None'}
-            Records Found: {len(data)}
-            Execution Time: {execution_time:.0f}ms
-            Success: {chat_response.success}
-            """
-            
-            summary_agent_result = await with_timeout(
-                response_summary_agent.run(response_context),
-                AI_AGENT_TIMEOUT,
-                "Response summary generation"
-            )
-            response_summary = summary_agent_result.data.summary + " " + str(summary_agent_result.data.metadata)    
-        except HTTPException as e:
-            if e.status_code == 408:
-                response_summary = f"Summary: {summary_response.summary[:100]}... (Summary generation timed out)"
-            else:
-                response_summary = f"Summary generation failed: {str(e)}"
-        except Exception as e:
-            response_summary = f"Summary generation error: {str(e)}"
+        if analysis is not None:
+            response_summary = analysis.response_summary + " " + str(analysis.metadata)
+        elif data:
+            # The analysis timed out, so there is no response summary either
+            response_summary = f"Summary: {summary_response.summary[:100]}... (Summary generation timed out)"
+        else:
+            try:
+                response_context = f"""
+                User Query: {request.query}
+                SQL Query: {sql_response.sql_query}
+                Data Summary: {summary_response.summary}
+                Key Insights: {', '.join(summary_response.key_insights)}
+                Recommendation: {summary_response.recommendation or 'None'}
+                Records Found: {len(data)}
+                Execution Time: {execution_time:.0f}ms
+                Success: {chat_response.success}
+                """
+                
+                summary_agent_result = await with_timeout(
+                    response_summary_agent.run(response_context),
+                    AI_AGENT_TIMEOUT,
+                    "Response summary generation"
+                )
+                response_summary = summary_agent_result.data.summary + " " + str(summary_agent_result.data.metadata)    
+            except HTTPException as e:
+                cacheable = False
+                if e.status_code == 408:
+                    response_summary = f"Summary: {summary_response.summary[:100]}... (Summary generation timed out)"
+                else:
+                    response_summary = f"Summary generation failed: {str(e)}"
+            except Exception as e:
+                cacheable = False
+                response_summary = f"Summary generation error: {str(e)}"
         
+        if bar_chart_response and bar_chart_response.get('chart_data_error'):
+            cacheable = False
         chat_response.response_summary = response_summary
+        cache_response(chat_id, request.query, chat_response, cacheable)
         
         try:
-            all_messages = summary_result.all_messages() if 'summary_result' in locals() else sql_result.all_messages()
-            await update_chat_history(chat_id, all_messages, request.query, chat_response.dict(), response_summary)
+            await update_chat_history(chat_id, all_messages, request.query, chat_response, response_summary)
         except Exception:
             pass
         
@@ -247,9 +267,9 @@ async def handle_chat_query_service(request: ChatQueryRequest):
     except HTTPException:
         raise
     except Exception as e:
-        execution_time = (datetime.now() - start_time).total_seconds() * 1000
+        execution_time = (time.perf_counter_ns() - start_ns) / 1e6
         
-        return ChatResponse(
+        return ChatResponse.model_construct(
             success=False,
             chat_id=request.chat_id or "unknown",
             query=request.query,
@@ -264,7 +284,58 @@ async def handle_chat_query_service(request: ChatQueryRequest):
             bar_chart=None
         )
 
-async def handle_simple_llm_query_service(request: ChatQueryRequest, chat_id: str, message_history: list, start_time: datetime) -> ChatResponse:
+async def _fetch_bar_chart(analysis: Optional[FusedAnalysisResponse], sql_query: str, data: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Build the bar chart response and, if a chart is possible, fetch the chart data.
+    A query grouped by one expression is charted from its parsed SQL; the analysis
+    decides for any other query. Chart query failures are recorded in the response instead of raised."""
+    derived_chart = chart_sql_from_ast(sql_query) if len(data) > 1 else None
+    if derived_chart is not None:
+        x_column, y_column, chart_sql = derived_chart
+        # The analysis usually names the same axes more descriptively
+        labelled = analysis is not None and analysis.chart_possible
+        bar_chart_response = {
+            'chart_possible': True,
+            'xlabel': (labelled and analysis.xlabel) or x_column or 'x',
+            'ylabel': (labelled and analysis.ylabel) or y_column or 'y',
+            'modified_sql': chart_sql,
+            'reason': None
+        }
+        
+        # Few enough rows to show are already the chart data, so skip the chart SQL
+        if (x_column and y_column and len(data) <= CHART_MAX_BARS and
+            x_column in data[0] and y_column in data[0]):
+            bar_chart_response['chart_data'] = [{'x': row[x_column], 'y': row[y_column]} for row in data]
+            return bar_chart_response
+    elif analysis is not None:
+        bar_chart_response = {
+            'chart_possible': analysis.chart_possible,
+            'xlabel': analysis.xlabel,
+            'ylabel': analysis.ylabel,
+            'modified_sql': analysis.modified_sql,
+            'reason': analysis.reason
+        }
+    else:
+        return None
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Bar chart analysis: %s", bar_chart_response)
+    
+    # Execute modified SQL if chart is possible and modified_sql is provided
+    if bar_chart_response['chart_possible'] and bar_chart_response['modified_sql']:
+        try:
+            validated_chart_query = await validate_and_fix_query_async(bar_chart_response['modified_sql'])
+            chart_data = await execute_query(validated_chart_query)
+            
+            # Add the chart data to the dict
+            bar_chart_response['chart_data'] = chart_data
+            logger.debug("Chart data executed successfully: %d rows", len(chart_data))
+        except Exception as chart_e:
+            logger.warning(f"Failed to execute chart SQL: {chart_e}")
+            # Add error info to the dict
+            bar_chart_response['chart_data_error'] = str(chart_e)
+    
+    return bar_chart_response
+
+async def handle_simple_llm_query_service(request: ChatQueryRequest, chat_id: str, message_history: list, start_ns: int) -> ChatResponse:
     try:
         simple_context = f"""
         User Query: {request.query}
@@ -274,6 +345,8 @@ async def handle_simple_llm_query_service(request: ChatQueryRequest, chat_id: st
         financial transactions, payment processing, or answer the user's question directly.
         """
         
+        # Degraded answers (timeouts or failed summaries) aren't cached
+        cacheable = True
         try:
             simple_result = await with_timeout(
                 summary_agent.run(simple_context, message_history=message_history if message_history else []),
@@ -289,12 +362,13 @@ async def handle_simple_llm_query_service(request: ChatQueryRequest, chat_id: st
                     recommendation="Please try asking your question again or be more specific.",
                     transaction_status=None
                 )
+                cacheable = False
             else:
                 raise
         
-        execution_time = (datetime.now() - start_time).total_seconds() * 1000
+        execution_time = (time.perf_counter_ns() - start_ns) / 1e6
         
-        chat_response = ChatResponse(
+        chat_response = ChatResponse.model_construct(
             success=True,
             chat_id=chat_id,
             query=request.query,
@@ -328,18 +402,21 @@ async def handle_simple_llm_query_service(request: ChatQueryRequest, chat_id: st
             )
             response_summary = summary_agent_result.data.summary + " " + str(summary_agent_result.data.metadata)    
         except HTTPException as e:
+            cacheable = False
             if e.status_code == 408:
                 response_summary = f"Summary: {simple_response.summary[:100]}... (Summary generation timed out)"
             else:
                 response_summary = f"Summary generation failed: {str(e)}"
         except Exception as e:
+            cacheable = False
             response_summary = f"Summary generation error: {str(e)}"
         
         chat_response.response_summary = response_summary
+        cache_response(chat_id, request.query, chat_response, cacheable)
         
         try:
             all_messages = simple_result.all_messages() if 'simple_result' in locals() else []
-            await update_chat_history(chat_id, all_messages, request.query, chat_response.dict(), response_summary)
+            await update_chat_history(chat_id, all_messages, request.query, chat_response, response_summary)
         except Exception:
             pass
         
@@ -348,9 +425,9 @@ async def handle_simple_llm_query_service(request: ChatQueryRequest, chat_id: st
     except HTTPException:
         raise
     except Exception as e:
-        execution_time = (datetime.now() - start_time).total_seconds() * 1000
+        execution_time = (time.perf_counter_ns() - start_ns) / 1e6
         
-        return ChatResponse(
+        return ChatResponse.model_construct(
             success=False,
             chat_id=chat_id,
             query=request.query,
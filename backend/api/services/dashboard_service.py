@@ -1,19 +1,23 @@
-import json
 import uuid
+import orjson
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List
 from fastapi import HTTPException
+from pydantic import TypeAdapter
 from ..models.schemas import (
     CreateDashboardRequest, AddChartToDashboardRequest,
-    DashboardResponse, DashboardChartsResponse, DashboardInfo, DashboardChart,
+    DashboardResponse, DashboardChartsResponse, DashboardChart,
     ApiResponse
 )
+from ..responses import ApiJSONResponse, api_response
 from ..database.queries import (
     create_dashboard_in_db, add_chart_to_dashboard_in_db,
-    get_all_dashboards_from_db, get_dashboard_charts_from_db,
-    dashboard_exists_in_db
+    get_all_dashboards_from_db, get_dashboard_charts_from_db
 )
 
+# Validates a whole list of chart rows in one pydantic-core call
+_CHART_LIST_ADAPTER = TypeAdapter(List[DashboardChart])
+
 async def create_dashboard_service(request: CreateDashboardRequest) -> DashboardResponse:
     """Service to create a new dashboard."""
     try:
@@ -24,7 +28,7 @@ async def create_dashboard_service(request: CreateDashboardRequest) -> Dashboard
         if not result:
             raise HTTPException(status_code=500, detail="Failed to create dashboard")
         
-        return DashboardResponse(
+        return DashboardResponse.model_construct(
             success=True,
             dashboard_id=result['id'],
             title=result['title'],
@@ -40,10 +44,6 @@ async def create_dashboard_service(request: CreateDashboardRequest) -> Dashboard
 async def add_chart_to_dashboard_service(request: AddChartToDashboardRequest) -> ApiResponse:
     """Service to add a chart to an existing dashboard."""
     try:
-        # Check if dashboard exists
-        if not await dashboard_exists_in_db(request.dashboard_id):
-            raise HTTPException(status_code=404, detail=f"Dashboard {request.dashboard_id} not found")
-        
         chart_id = str(uuid.uuid4())
         
         result = await add_chart_to_dashboard_in_db(
@@ -56,7 +56,7 @@ async def add_chart_to_dashboard_service(request: AddChartToDashboardRequest) ->
         if not result:
             raise HTTPException(status_code=500, detail="Failed to add chart to dashboard")
         
-        return ApiResponse(
+        return ApiResponse.model_construct(
             success=True,
             message="Chart added to dashboard successfully",
             data={
@@ -72,23 +72,24 @@ async def add_chart_to_dashboard_service(request: AddChartToDashboardRequest) ->
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error adding chart to dashboard: {str(e)}")
 
-async def get_all_dashboards_service() -> ApiResponse:
+async def get_all_dashboards_service() -> ApiJSONResponse:
     """Service to get all dashboards."""
     try:
         dashboards_data = await get_all_dashboards_from_db()
         
-        dashboards = []
-        for data in dashboards_data:
-            dashboard = DashboardInfo(
-                id=data['id'],
-                title=data['title'],
-                charts_count=data['charts_count'],
-                created_at=data['created_at'].isoformat(),
-                updated_at=data['updated_at'].isoformat()
-            )
-            dashboards.append(dashboard.dict())
+        # Timestamps are datetimes; orjson encodes them as ISO 8601
+        dashboards = [
+            {
+                "id": data['id'],
+                "title": data['title'],
+                "charts_count": data['charts_count'],
+                "created_at": data['created_at'],
+                "updated_at": data['updated_at']
+            }
+            for data in dashboards_data
+        ]
         
-        return ApiResponse(
+        return api_response(
             success=True,
             message=f"Retrieved {len(dashboards)} dashboards",
             data={
@@ -100,42 +101,37 @@ async def get_all_dashboards_service() -> ApiResponse:
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving dashboards: {str(e)}")
 
+def _parse_chart_data(chart_data_raw: Any) -> Dict[str, Any]:
+    """Ensure stored chart_data is a dict."""
+    if isinstance(chart_data_raw, (str, bytes)):
+        try:
+            return orjson.loads(chart_data_raw)
+        except orjson.JSONDecodeError:
+            # If parsing fails, wrap in dict
+            return {"raw_data": chart_data_raw}
+    if isinstance(chart_data_raw, dict):
+        return chart_data_raw
+    return {"data": chart_data_raw}
+
 async def get_dashboard_charts_service(dashboard_id: str) -> DashboardChartsResponse:
     """Service to get all charts for a specific dashboard."""
     try:
-        # Check if dashboard exists
-        if not await dashboard_exists_in_db(dashboard_id):
-            raise HTTPException(status_code=404, detail=f"Dashboard {dashboard_id} not found")
-        
         charts_data = await get_dashboard_charts_from_db(dashboard_id)
+        if charts_data is None:
+            raise HTTPException(status_code=404, detail=f"Dashboard {dashboard_id} not found")
         
-        charts = []
-        for data in charts_data:
-            # Ensure chart_data is a dict
-            chart_data_raw = data['chart_data']
-            chart_data: Dict[str, Any]
-            
-            if isinstance(chart_data_raw, str):
-                try:
-                    chart_data = json.loads(chart_data_raw)
-                except json.JSONDecodeError:
-                    # If parsing fails, wrap in dict
-                    chart_data = {"raw_data": chart_data_raw}
-            elif isinstance(chart_data_raw, dict):
-                chart_data = chart_data_raw
-            else:
-                chart_data = {"data": chart_data_raw}
-            
-            chart = DashboardChart(
-                chart_id=data['chart_id'],
-                dashboard_id=data['dashboard_id'],
-                chart_title=data['chart_title'],
-                chart_data=chart_data,
-                created_at=data['created_at'].isoformat()
-            )
-            charts.append(chart)
+        charts = _CHART_LIST_ADAPTER.validate_python([
+            {
+                "chart_id": data['chart_id'],
+                "dashboard_id": data['dashboard_id'],
+                "chart_title": data['chart_title'],
+                "chart_data": _parse_chart_data(data['chart_data']),
+                "created_at": data['created_at'].isoformat()
+            }
+            for data in charts_data
+        ])
         
-        return DashboardChartsResponse(
+        return DashboardChartsResponse.model_construct(
             success=True,
             dashboard_id=dashboard_id,
             charts=charts,
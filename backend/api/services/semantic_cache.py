@@ -0,0 +1,137 @@
+import asyncio
+import hashlib
+import logging
+import re
+from typing import Dict, List, Optional, Set, Tuple
+from cachetools import TTLCache
+from openai import AsyncOpenAI
+from ..models.schemas import ChatResponse
+from ..config import (
+    RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_MAX_PER_CHAT,
+    RESPONSE_CACHE_SIMILARITY, EMBEDDING_MODEL, QUERY_CACHE_TTL
+)
+
+logger = logging.getLogger(__name__)
+
+# Exact tier: (chat_id, normalized query digest) -> ChatResponse. Answers built
+# from query results expire with the query-result cache so their numbers stay fresh.
+_responses: TTLCache = TTLCache(maxsize=RESPONSE_CACHE_MAX_ENTRIES, ttl=RESPONSE_CACHE_TTL)
+_data_responses: TTLCache = TTLCache(maxsize=RESPONSE_CACHE_MAX_ENTRIES, ttl=QUERY_CACHE_TTL)
+# Semantic tier: chat_id -> {query digest: (embedding, terms)} for the chat's cached responses
+_chat_embeddings: TTLCache = TTLCache(maxsize=RESPONSE_CACHE_MAX_ENTRIES, ttl=RESPONSE_CACHE_TTL)
+# Query digest -> embedding, so a query embedded for a lookup isn't embedded again on insert
+_query_embeddings: TTLCache = TTLCache(maxsize=RESPONSE_CACHE_MAX_ENTRIES, ttl=RESPONSE_CACHE_TTL)
+
+# Background embedding tasks, referenced until done so they aren't garbage collected
+_pending_tasks: Set[asyncio.Task] = set()
+_openai_client: Optional[AsyncOpenAI] = None
+
+_WHITESPACE = re.compile(r'\s+')
+# Quoted strings and words: values like 'failed', tx_123 and 7 stay whole
+_TERM = re.compile(r"'[^']*'|\"[^\"]*\"|\w+")
+# Words that rephrase a question without changing which data it asks for
+_STOPWORDS = frozenset("""
+    a an the of for in on at to from by with and or is are was were be been do does did
+    me my i we our us you your it its this that these those there what which who how
+    show tell give get list find display please can could would will should
+""".split())
+
+def normalize_query(query: str) -> str:
+    """Normalize a query for exact matching: case, whitespace and trailing punctuation."""
+    return _WHITESPACE.sub(' ', query).strip().rstrip('?.!').lower()
+
+def _terms(query: str) -> frozenset:
+    """The words of a query that select its data. Queries that differ in any of
+    these ("today" and "yesterday", "BTC" and "ETH") can embed almost identically
+    but ask for different data."""
+    return frozenset(term for term in _TERM.findall(query.lower()) if term not in _STOPWORDS)
+
+def _query_key(query: str) -> bytes:
+    return hashlib.blake2b(normalize_query(query).encode(), digest_size=16).digest()
+
+def _cached(chat_id: str, key: bytes) -> Optional[ChatResponse]:
+    return _responses.get((chat_id, key)) or _data_responses.get((chat_id, key))
+
+async def embed_query(query: str) -> Optional[List[float]]:
+    """Embed a query with EMBEDDING_MODEL, or return None if the embedding call fails."""
+    global _openai_client
+    key = _query_key(query)
+    embedding = _query_embeddings.get(key)
+    if embedding is not None:
+        return embedding
+
+    try:
+        if _openai_client is None:
+            _openai_client = AsyncOpenAI()
+        result = await _openai_client.embeddings.create(model=EMBEDDING_MODEL, input=normalize_query(query))
+    except Exception as e:
+        logger.warning(f"Query embedding failed, skipping semantic cache: {e}")
+        return None
+
+    embedding = result.data[0].embedding
+    _query_embeddings[key] = embedding
+    return embedding
+
+def _similarity(a: List[float], b: List[float]) -> float:
+    # Embeddings are unit length, so the dot product is the cosine similarity
+    return sum(x * y for x, y in zip(a, b))
+
+async def lookup_cached_response(chat_id: str, query: str) -> Optional[ChatResponse]:
+    """Return a cached response for this query, or a semantically equivalent one, in the same chat."""
+    key = _query_key(query)
+    cached = _cached(chat_id, key)
+    if cached is not None:
+        return cached
+
+    # Only embed the query when the chat has cached responses to compare against
+    vectors: Optional[Dict[bytes, Tuple[List[float], frozenset]]] = _chat_embeddings.get(chat_id)
+    if not vectors:
+        return None
+    embedding = await embed_query(query)
+    if embedding is None:
+        return None
+
+    terms = _terms(query)
+    best: Tuple[float, Optional[ChatResponse]] = (RESPONSE_CACHE_SIMILARITY, None)
+    for cached_key, (vector, cached_terms) in vectors.items():
+        # A semantic hit may reword or reorder the question, but not change what it asks for
+        if cached_terms != terms:
+            continue
+        score = _similarity(embedding, vector)
+        if score >= best[0]:
+            response = _cached(chat_id, cached_key)
+            if response is not None:
+                best = (score, response)
+    return best[1]
+
+async def _index_response(chat_id: str, key: bytes, query: str):
+    embedding = await embed_query(query)
+    if embedding is None:
+        return
+    vectors = _chat_embeddings.get(chat_id) or {}
+    vectors[key] = (embedding, _terms(query))
+    while len(vectors) > RESPONSE_CACHE_MAX_PER_CHAT:
+        del vectors[next(iter(vectors))]
+    # Re-set so the chat's index lives as long as its newest response
+    _chat_embeddings[chat_id] = vectors
+
+def cache_response(chat_id: str, query: str, response: ChatResponse, cacheable: bool):
+    """Cache a complete response for exact reuse now and semantic reuse once its query is embedded.
+
+    Callers pass cacheable=False for degraded answers, such as timeout fallbacks,
+    which are still successful but shouldn't be replayed when the user retries."""
+    if not cacheable or not response.success:
+        return
+    key = _query_key(query)
+    # The newest answer replaces an older one of the other kind
+    if response.sql_query:
+        _responses.pop((chat_id, key), None)
+        _data_responses[(chat_id, key)] = response
+    else:
+        _data_responses.pop((chat_id, key), None)
+        _responses[(chat_id, key)] = response
+
+    # Embed off the request path so a miss pays no extra latency
+    task = asyncio.create_task(_index_response(chat_id, key, query))
+    _pending_tasks.add(task)
+    task.add_done_callback(_pending_tasks.discard)
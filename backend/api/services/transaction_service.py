@@ -1,13 +1,24 @@
 
-import json
+import re
+import orjson
 import asyncio
+from cachetools import TTLCache
 from fastapi import HTTPException
 from ..models.schemas import ApiResponse, TransactionSummary, FailedTransactionRetryResponse, GrafanaWebhookRequest
-from ..database.queries import execute_query
+from ..database.queries import execute_query, stream_query, invalidate_query_cache
 from ..ai.agents import failed_transaction_retry_agent
-from ..chat.manager import transaction_details_from_db, insert_transaction_details_to_db
-from ..config import AI_AGENT_TIMEOUT
-from ..database.connection import get_chats_db_connection
+from ..chat.manager import transaction_details_from_db, queue_alert_insert
+from ..config import AI_AGENT_TIMEOUT, DATABASE_TIMEOUT, SUMMARY_CACHE_TTL
+from ..database.connection import chats_connection, transactions_connection
+from ..http_cache import bump_resource_version
+
+# Transaction ids are UUIDs or short word-character tokens such as tx_123
+_TRANSACTION_ID = re.compile(r'[\w-]{1,128}')
+
+# The latest transaction summary, keyed by the empty tuple. The lock lets
+# concurrent dashboard loads share one query when the entry has expired.
+_summary_cache: TTLCache = TTLCache(maxsize=1, ttl=SUMMARY_CACHE_TTL)
+_summary_lock = asyncio.Lock()
 
 async def with_timeout(coro, timeout_seconds: float, operation_name: str):
     """Wrapper to add timeout to any async operation."""
@@ -20,19 +31,31 @@ async def with_timeout(coro, timeout_seconds: float, operation_name: str):
         )
 
 async def get_transaction_summary_service():
+    """Summarize each transaction's latest event, cached for SUMMARY_CACHE_TTL seconds."""
+    summary = _summary_cache.get(())
+    if summary is not None:
+        return summary
+    
+    async with _summary_lock:
+        summary = _summary_cache.get(())
+        if summary is not None:
+            return summary
+        summary = await _fetch_transaction_summary()
+        if summary is not None:
+            _summary_cache[()] = summary
+        return summary
+
+async def _fetch_transaction_summary():
+    # DISTINCT ON keeps only each transaction's latest event instead of numbering every event.
+    # The query runs directly rather than through execute_query so its 30s result cache
+    # doesn't outlive the summary cache.
     sql_query = """
-    WITH latest_events AS (
-        SELECT *, 
-               ROW_NUMBER() OVER (PARTITION BY transaction_id ORDER BY timestamp::timestamptz DESC) as rn
-        FROM transactions
-    ),
-    transaction_status AS (
-        SELECT 
+    WITH transaction_status AS (
+        SELECT DISTINCT ON (transaction_id)
             transaction_id,
-            event_type,
             CASE WHEN event_type = 'SettlementConfirmed' THEN 'SUCCESSFUL' ELSE 'FAILED' END as final_status
-        FROM latest_events 
-        WHERE rn = 1
+        FROM transactions
+        ORDER BY transaction_id, timestamp::timestamptz DESC
     )
     SELECT 
         COUNT(*) as total_transactions,
@@ -44,9 +67,9 @@ async def get_transaction_summary_service():
     FROM transaction_status;
     """
     
-    result = await execute_query(sql_query)
-    if result:
-        data = result[0]
+    async with transactions_connection() as conn:
+        data = await with_timeout(conn.fetchrow(sql_query), DATABASE_TIMEOUT, "Transaction summary query")
+    if data:
         summary = TransactionSummary(
             total_transactions=data['total_transactions'],
             successful_transactions=data['successful_transactions'],
@@ -57,12 +80,12 @@ async def get_transaction_summary_service():
     return None
 
 async def get_user_transactions_service(user_id: str, limit: int):
-    sql_query = f"""
+    sql_query = """
     WITH latest_events AS (
         SELECT *, 
                ROW_NUMBER() OVER (PARTITION BY transaction_id ORDER BY timestamp::timestamptz DESC) as rn
         FROM transactions 
-        WHERE user_id = '{user_id}'
+        WHERE user_id = $1
     )
     SELECT 
         transaction_id,
@@ -77,38 +100,42 @@ async def get_user_transactions_service(user_id: str, limit: int):
     FROM latest_events 
     WHERE rn = 1 
     ORDER BY timestamp::timestamptz DESC 
-    LIMIT {limit};
+    LIMIT $2;
     """
     
-    return await execute_query(sql_query)
+    return await execute_query(sql_query, user_id, limit)
 
-async def get_transaction_alerts_service():
+def get_transaction_alerts_service():
+    """Stream alert rows, newest first."""
     sql_query = f"""SELECT * FROM alerts ORDER BY timestamp::timestamptz desc;"""
-    return await execute_query(sql_query)
+    return stream_query(sql_query)
 
-async def update_alert_service(alert_id: str):
-    conn = await get_chats_db_connection()
-    sql_query = f"UPDATE alerts SET is_seen = true WHERE id ='{alert_id}'"
-    await conn.execute(sql_query)
-    await conn.close()
+async def update_alert_service(alert_id: int):
+    async with chats_connection() as conn:
+        await conn.execute("UPDATE alerts SET is_seen = true WHERE id = $1", alert_id)
+    invalidate_query_cache()
+    bump_resource_version("alerts")
 
 async def handle_grafana_webhook_service(request: GrafanaWebhookRequest):
-    data = request.model_dump()
-    
-    if data.get('state') != 'alerting':
-        return {"status": "ignored", "reason": f"State was '{data.get('state')}'"}
+    if request.state != 'alerting':
+        return {"status": "ignored", "reason": f"State was '{request.state}'"}
 
-    transaction_id = data.get('message', {})
-    
-    if not transaction_id:
-        raise HTTPException(status_code=400, detail="'transaction_id' tag not found in Grafana alert")
+    # The message carries the transaction id, with the alert's labels as a fallback
+    # when the message is empty or isn't a valid id (e.g. free-form alert text)
+    candidates = [request.message.strip(), (request.labels or {}).get('transaction_id', '').strip()]
+    transaction_id = next((c for c in candidates if _TRANSACTION_ID.fullmatch(c)), None)
+
+    if transaction_id is None:
+        if not any(candidates):
+            raise HTTPException(status_code=400, detail="'transaction_id' tag not found in Grafana alert")
+        raise HTTPException(status_code=400, detail="Invalid 'transaction_id' in Grafana alert")
 
     transaction_details = await transaction_details_from_db(transaction_id)
 
     try:
         augmented_query = f"""
             User Query: Summary of the transaction
-            Transaction Details: {json.dumps(transaction_details, indent=2)}
+            Transaction Details: {orjson.dumps(transaction_details, default=str, option=orjson.OPT_SORT_KEYS).decode()}
         """
         
         simple_result = await with_timeout(
@@ -127,12 +154,12 @@ async def handle_grafana_webhook_service(request: GrafanaWebhookRequest):
         else:
             raise
 
-    await insert_transaction_details_to_db(transaction_id, simple_response.summary)
+    await queue_alert_insert(transaction_id, simple_response.summary)
     
     return simple_response
 
 async def get_failed_transaction_details_service(transaction_id: str):
-    sql_query = f"""
-    SELECT * FROM alerts WHERE transaction_id = '{transaction_id}';
+    sql_query = """
+    SELECT * FROM alerts WHERE transaction_id = $1;
     """
-    return await execute_query(sql_query)
+    return await execute_query(sql_query, transaction_id)